@@ -1,19 +1,240 @@
+import asyncio
+import atexit
+import json
 import logging
-from pathlib import Path
 import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "backend/auth"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-LOG_FILE = DATA_DIR / "access_audit.log"
+# One JSON object per line; rotated files sit next to it with a timestamp.
+LOG_FILE = DATA_DIR / "access_audit.jsonl"
+
+AUDIT_FSYNC_INTERVAL_SECONDS = float(os.getenv("AUDIT_FSYNC_INTERVAL_SECONDS", "1.0"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "256"))
+# Callers block once this many records are waiting.
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+AUDIT_ROTATE_MAX_BYTES = int(os.getenv("AUDIT_ROTATE_MAX_BYTES", str(50 * 1024 * 1024)))
+AUDIT_ROTATE_DAILY = os.getenv("AUDIT_ROTATE_DAILY", "true").lower() == "true"
+# A batch that fails to write is retried, backing off up to this long; the
+# queue fills up meanwhile and callers block. After AUDIT_MAX_RETRIES the
+# batch is dropped and logged as an error instead.
+AUDIT_RETRY_MAX_SECONDS = float(os.getenv("AUDIT_RETRY_MAX_SECONDS", "30"))
+AUDIT_MAX_RETRIES = int(os.getenv("AUDIT_MAX_RETRIES", "10"))
+# How long interpreter exit waits for queued records to be written.
+AUDIT_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("AUDIT_SHUTDOWN_TIMEOUT_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        self.queue: queue.Queue = queue.Queue(maxsize=AUDIT_QUEUE_MAX)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._opened_day = None
+        self._last_fsync = 0.0
+        self._dirty = False
+        self.written = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="audit-writer",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def put(self, record: dict):
+        self._ensure_started()
+        self.queue.put(record)
+
+    def put_nowait(self, record: dict):
+        self._ensure_started()
+        self.queue.put_nowait(record)
+
+    # Blocks until everything queued so far has been written to the file;
+    # the fsync follows within AUDIT_FSYNC_INTERVAL_SECONDS. Returns False if
+    # the timeout ran out first.
+    def flush(self, timeout: float = None) -> bool:
+        if self._thread is None:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self):
+        if not self.flush(AUDIT_SHUTDOWN_TIMEOUT_SECONDS):
+            logger.error(
+                "Audit log writer still had %d records queued at exit",
+                self.queue.unfinished_tasks,
+            )
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_day = datetime.now(timezone.utc).date()
+
+    def _rotate_if_needed(self):
+        if self._file is None:
+            self._open()
+
+        day = datetime.now(timezone.utc).date()
+        too_big = self._file.tell() >= AUDIT_ROTATE_MAX_BYTES
+        new_day = AUDIT_ROTATE_DAILY and day != self._opened_day
+        if not (too_big or new_day):
+            return
+
+        self._sync()
+        self._file.close()
+        # Reopened below, or by the next write if the rename fails.
+        self._file = None
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        target = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        n = 1
+        while target.exists():
+            target = self.path.with_name(f"{self.path.stem}.{stamp}-{n}{self.path.suffix}")
+            n += 1
+        os.replace(self.path, target)
+
+        self.rotations += 1
+        self._open()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+
+    def _write(self, batch):
+        self._rotate_if_needed()
+        self._file.write(
+            "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch)
+        )
+        self._file.flush()
+        self._dirty = True
+        self.written += len(batch)
+
+        if time.monotonic() - self._last_fsync >= AUDIT_FSYNC_INTERVAL_SECONDS:
+            self._sync()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=AUDIT_FSYNC_INTERVAL_SECONDS)]
+            except queue.Empty:
+                # Idle: make sure the tail of the last batch reaches disk.
+                if self._dirty:
+                    self._sync()
+                continue
+
+            while len(batch) < AUDIT_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write_until_done(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    # A failing batch is retried (possibly duplicating lines that made it
+    # out before the error); once the retries run out its records go to the
+    # error log so they are not lost silently.
+    def _write_until_done(self, batch):
+        delay = 0.1
+        for attempt in range(AUDIT_MAX_RETRIES + 1):
+            try:
+                self._write(batch)
+                return
+            except Exception:
+                self.write_errors += 1
+                self._discard_file()
+                if attempt == AUDIT_MAX_RETRIES:
+                    break
+                logger.exception("Audit log write failed; retrying in %.1fs", delay)
+                time.sleep(delay)
+                delay = min(delay * 2, AUDIT_RETRY_MAX_SECONDS)
+
+        self.dropped += len(batch)
+        logger.error(
+            "Audit log write failed %d times; dropping %d records: %s",
+            AUDIT_MAX_RETRIES + 1,
+            len(batch),
+            "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch),
+        )
+
+    def _discard_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+        self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+            "dropped": self.dropped,
+        }
+
+
+_writer = AuditWriter(LOG_FILE)
+atexit.register(_writer.shutdown)
+
+
+def _record(username, role, query, results_count, **extra) -> dict:
+    return {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "user": username,
+        "role": role,
+        "query": query,
+        "results": results_count,
+        **extra,
+    }
+
+
+# Enqueues the record; blocks only if the writer is AUDIT_QUEUE_MAX behind.
+def log_access(username, role, query, results_count, **extra):
+    _writer.put(_record(username, role, query, results_count, **extra))
+
+
+# Event-loop friendly variant: the blocking wait only happens in a worker
+# thread, and only when the queue is full.
+async def alog_access(username, role, query, results_count, **extra):
+    record = _record(username, role, query, results_count, **extra)
+    try:
+        _writer.put_nowait(record)
+    except queue.Full:
+        await asyncio.to_thread(_writer.put, record)
+
+
+def flush_audit_log():
+    _writer.flush()
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s | %(message)s",
-)
 
-def log_access(username, role, query, results_count):
-    logging.info(
-        f"user={username} role={role} query='{query}' results={results_count}"
-    )
+def audit_log_stats() -> dict:
+    return _writer.stats()
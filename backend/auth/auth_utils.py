@@ -1,8 +1,12 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from jose import jwt
 
+from backend.metrics import span, record_cache
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -14,5 +18,34 @@ def create_access_token(data: dict) -> str:
     payload["exp"] = datetime.utcnow() + timedelta(minutes=EXPIRE_MINUTES)
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+# Verified claims per token, kept until the token's own expiry.
+_CLAIMS_CACHE_MAX_ENTRIES = 10000
+_claims_cache: dict = {}
+_claims_cache_lock = threading.Lock()
+
 def decode_access_token(token: str) -> dict:
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    with _claims_cache_lock:
+        payload = _claims_cache.get(token)
+
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            record_cache("jwt", True)
+            return dict(payload)
+        with _claims_cache_lock:
+            _claims_cache.pop(token, None)
+
+    record_cache("jwt", False)
+    with span("jwt_decode"):
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    with _claims_cache_lock:
+        if len(_claims_cache) >= _CLAIMS_CACHE_MAX_ENTRIES:
+            now = time.time()
+            for key in [k for k, v in _claims_cache.items() if v.get("exp", 0) <= now]:
+                del _claims_cache[key]
+            if len(_claims_cache) >= _CLAIMS_CACHE_MAX_ENTRIES:
+                _claims_cache.clear()
+        if "exp" in payload:
+            _claims_cache[token] = payload
+
+    return dict(payload)
@@ -1,9 +1,101 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from backend.metrics import observe_stage
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small dedicated thread pool keeps logins off
+# the shared request threadpool. Work beyond workers + queue is rejected.
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", "4"))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "32"))
+
+_pool = ThreadPoolExecutor(
+    max_workers=PASSWORD_POOL_WORKERS,
+    thread_name_prefix="bcrypt",
+)
+_pending = 0
+_lock = threading.Lock()
+
+_stats = {
+    "completed": 0,
+    "rejected": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+    "verify_seconds_total": 0.0,
+    "verify_seconds_max": 0.0,
+}
+
+
+class PasswordPoolFull(Exception):
+    pass
+
+
+def _timed(fn, stage: str, submitted_at: float, *args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        finished = time.perf_counter()
+        wait, work = started - submitted_at, finished - started
+        observe_stage("bcrypt_queue_wait", wait)
+        observe_stage(stage, work)
+        with _lock:
+            _stats["completed"] += 1
+            _stats["wait_seconds_total"] += wait
+            _stats["wait_seconds_max"] = max(_stats["wait_seconds_max"], wait)
+            _stats["verify_seconds_total"] += work
+            _stats["verify_seconds_max"] = max(_stats["verify_seconds_max"], work)
+
+
+def _release(_future):
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _submit(fn, stage: str, *args, bounded: bool):
+    global _pending
+    with _lock:
+        if bounded and _pending >= PASSWORD_POOL_WORKERS + PASSWORD_POOL_MAX_QUEUE:
+            _stats["rejected"] += 1
+            raise PasswordPoolFull()
+        _pending += 1
+
+    context = contextvars.copy_context()
+    future = _pool.submit(context.run, _timed, fn, stage, time.perf_counter(), *args)
+    future.add_done_callback(_release)
+    return future
+
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    # Admin-only path; waits for a worker instead of being rejected.
+    return _submit(pwd_context.hash, "bcrypt_hash", password, bounded=False).result()
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return _submit(pwd_context.verify, "bcrypt_verify", plain, hashed, bounded=True).result()
+
+async def averify_password(plain: str, hashed: str) -> bool:
+    future = _submit(pwd_context.verify, "bcrypt_verify", plain, hashed, bounded=True)
+    return await asyncio.wrap_future(future)
+
+def password_pool_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["pending"] = _pending
+    stats["workers"] = PASSWORD_POOL_WORKERS
+    stats["max_queue"] = PASSWORD_POOL_MAX_QUEUE
+    stats["bcrypt_rounds"] = BCRYPT_ROUNDS
+    return stats
@@ -1,9 +1,63 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 from backend.db.database import SessionLocal
 from backend.db.models import UserDB
 from backend.models.user import User
 from backend.auth.password_utils import hash_password
+from backend.metrics import span, record_cache
+
+# Short-lived cache so the auth dependency doesn't hit SQLite on every request.
+# Creates and deletes only clear it in the worker that handled them; other
+# uvicorn workers keep serving their copy (including "no such user") for up
+# to USER_CACHE_TTL_SECONDS. That TTL is the window in which a deleted user
+# keeps access, so keep it short; 0 disables the cache.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "3"))
+USER_CACHE_MAX_ENTRIES = 10000
+
+_user_cache: Dict[str, Tuple[float, Optional[User]]] = {}
+_user_cache_lock = threading.Lock()
+_user_cache_generation = 0
+
+
+# Local to this process; see USER_CACHE_TTL_SECONDS.
+def invalidate_user(username: Optional[str] = None):
+    global _user_cache_generation
+    with _user_cache_lock:
+        _user_cache_generation += 1
+        if username is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(username, None)
+
 
 def get_user_by_username(username: str):
+    now = time.monotonic()
+
+    with _user_cache_lock:
+        entry = _user_cache.get(username)
+        if entry is not None and entry[0] > now:
+            record_cache("user", True)
+            return entry[1]
+        generation = _user_cache_generation
+
+    record_cache("user", False)
+    with span("user_lookup"):
+        user = _load_user(username)
+
+    with _user_cache_lock:
+        # Skip the write if create/delete ran while we were reading.
+        if USER_CACHE_TTL_SECONDS > 0 and generation == _user_cache_generation:
+            if len(_user_cache) >= USER_CACHE_MAX_ENTRIES:
+                _user_cache.clear()
+            _user_cache[username] = (now + USER_CACHE_TTL_SECONDS, user)
+
+    return user
+
+
+def _load_user(username: str):
     db = SessionLocal()
     try:
         user = db.query(UserDB).filter(UserDB.username == username).first()
@@ -45,6 +99,7 @@ def create_user(username: str, role: str, password: str):
 
         db.add(user)
         db.commit()
+        invalidate_user(username)
         return {"username": username, "role": role.lower()}
     finally:
         db.close()
@@ -59,6 +114,7 @@ def delete_user(username: str):
 
         db.delete(user)
         db.commit()
+        invalidate_user(username)
         return True
     finally:
         db.close()
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Type
+
+# Backends raise on failure and return "" for an empty answer;
+# LLMClient turns both into user-facing messages.
+
+
+# Raised with the provider's HTTP status so the scheduler can tell
+# retryable failures (429, 5xx) from the rest.
+class LLMBackendError(Exception):
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(message or f"LLM backend returned {status_code}")
+        self.status_code = status_code
+
+
+# Only async calls: every request reaches a backend through LLMScheduler,
+# which runs them on its own event loop.
+class LLMBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def agenerate(self, prompt: str) -> str:
+        ...
+
+    # Implemented as an async generator.
+    @abstractmethod
+    def astream(self, prompt: str) -> AsyncIterator[str]:
+        ...
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self):
+        from google import genai
+        from google.genai import types
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("❌ GEMINI_API_KEY not found in .env file")
+
+        self.client = genai.Client(api_key=api_key)
+        self.model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+        self.config = types.GenerateContentConfig(
+            temperature=0.2,
+            max_output_tokens=2048, 
+        )
+
+    async def agenerate(self, prompt: str) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self.config,
+        )
+        return (response.text or "") if response else ""
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        async for chunk in self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self.config,
+        ):
+            if chunk and chunk.text:
+                yield chunk.text
+
+
+# Any server speaking the OpenAI chat completions API (vLLM, llama.cpp,
+# Ollama, LM Studio...), usually a local one.
+class OpenAICompatibleBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self):
+        import httpx
+
+        self.httpx = httpx
+        self.url = os.getenv("OPENAI_BASE_URL", "http://localhost:8001/v1").rstrip("/") + "/chat/completions"
+        self.model = os.getenv("OPENAI_MODEL", "local-model")
+        api_key = os.getenv("OPENAI_API_KEY")
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        # Created on first use, inside the scheduler loop that owns it.
+        self._client = None
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.2,
+            "max_tokens": 2048,
+            "stream": stream,
+        }
+
+    def _async_client(self):
+        if self._client is None:
+            # No client-side timeout: the scheduler bounds each attempt.
+            self._client = self.httpx.AsyncClient(timeout=None)
+        return self._client
+
+    @staticmethod
+    def _raise_for_status(response):
+        if response.status_code >= 400:
+            raise LLMBackendError(response.status_code, response.text[:200])
+
+    @staticmethod
+    def _message(body: dict) -> str:
+        return body["choices"][0]["message"].get("content") or ""
+
+    async def agenerate(self, prompt: str) -> str:
+        try:
+            response = await self._async_client().post(
+                self.url, json=self._payload(prompt, False), headers=self.headers
+            )
+        except self.httpx.TransportError as e:
+            raise LLMBackendError(503, str(e)) from e
+        self._raise_for_status(response)
+        return self._message(response.json())
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        try:
+            async with self._async_client().stream(
+                "POST", self.url, json=self._payload(prompt, True), headers=self.headers
+            ) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    self._raise_for_status(response)
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        yield text
+        except self.httpx.TransportError as e:
+            raise LLMBackendError(503, str(e)) from e
+
+
+# Offline stand-in for load tests: waits FAKE_LLM_LATENCY_MS before the first
+# token, then emits FAKE_LLM_TOKENS words FAKE_LLM_TOKEN_INTERVAL_MS apart.
+# FAKE_LLM_ERROR_RATE of calls fail with a 429 to exercise retries.
+class FakeBackend(LLMBackend):
+    name = "fake"
+
+    def __init__(self):
+        self.latency = float(os.getenv("FAKE_LLM_LATENCY_MS", "800")) / 1000
+        self.tokens = int(os.getenv("FAKE_LLM_TOKENS", "60"))
+        self.interval = float(os.getenv("FAKE_LLM_TOKEN_INTERVAL_MS", "20")) / 1000
+        self.error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+
+    def _maybe_fail(self):
+        if random.random() < self.error_rate:
+            raise LLMBackendError(429, "fake rate limit")
+
+    def _words(self, prompt: str):
+        words = ["-", "Answer", "based", "on", f"{len(prompt)}", "characters", "of", "context."]
+        return [words[i % len(words)] for i in range(self.tokens)]
+
+    async def agenerate(self, prompt: str) -> str:
+        self._maybe_fail()
+        await asyncio.sleep(self.latency + self.tokens * self.interval)
+        return " ".join(self._words(prompt))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        self._maybe_fail()
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self._words(prompt)):
+            if i:
+                await asyncio.sleep(self.interval)
+            yield word if i == 0 else f" {word}"
+
+
+BACKENDS: Dict[str, Type[LLMBackend]] = {
+    GeminiBackend.name: GeminiBackend,
+    OpenAICompatibleBackend.name: OpenAICompatibleBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def create_backend(name: str) -> LLMBackend:
+    name = name.lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    return BACKENDS[name]()
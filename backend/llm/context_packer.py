@@ -0,0 +1,98 @@
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# Approximate prompt tokens allowed for retrieved context.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+# Blocks smaller than this are dropped rather than truncated.
+MIN_BLOCK_TOKENS = 50
+
+_CHUNK_INDEX_RE = re.compile(r"::chunk_(\d+)$")
+
+
+# Cheap estimate (~4 characters per token); close enough for budgeting.
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+def _chunk_index(doc: Document) -> Optional[int]:
+    match = _CHUNK_INDEX_RE.search(doc.metadata.get("chunk_id", ""))
+    return int(match.group(1)) if match else None
+
+
+# Appends b to a, dropping the prefix of b that repeats the tail of a.
+def merge_overlap(a: str, b: str, probe: int = 20) -> str:
+    head = b[:probe]
+    pos = a.find(head)
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return a + b[len(a) - pos:]
+        pos = a.find(head, pos + 1)
+    return f"{a} {b}"
+
+
+class ContextBlock:
+    def __init__(self, source: str, rank: int, text: str, last_index: Optional[int]):
+        self.source = source
+        self.rank = rank
+        self.text = text
+        self.last_index = last_index
+
+
+# Merges neighbouring chunks of the same file, then fills the budget in
+# relevance order (documents are assumed to be sorted best first).
+def pack_context(
+    documents: List[Document],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+) -> List[ContextBlock]:
+    ranked: List[Tuple[Document, int]] = [(doc, rank) for rank, doc in enumerate(documents)]
+
+    by_source: Dict[str, List[Tuple[Document, int]]] = {}
+    for doc, rank in ranked:
+        by_source.setdefault(doc.metadata.get("source_path", "Unknown"), []).append((doc, rank))
+
+    blocks: List[ContextBlock] = []
+    for source, members in by_source.items():
+        members.sort(key=lambda pair: (_chunk_index(pair[0]) is None, _chunk_index(pair[0]) or 0))
+
+        current: Optional[ContextBlock] = None
+        for doc, rank in members:
+            index = _chunk_index(doc)
+            text = doc.page_content.strip()
+
+            if (
+                current is not None
+                and index is not None
+                and current.last_index is not None
+                and index <= current.last_index + 1
+            ):
+                if index == current.last_index + 1:
+                    current.text = merge_overlap(current.text, text)
+                current.rank = min(current.rank, rank)
+                current.last_index = max(current.last_index, index)
+                continue
+
+            current = ContextBlock(source, rank, text, index)
+            blocks.append(current)
+
+    blocks.sort(key=lambda block: block.rank)
+
+    packed: List[ContextBlock] = []
+    remaining = token_budget
+    for block in blocks:
+        cost = estimate_tokens(block.text)
+        if cost <= remaining:
+            packed.append(block)
+            remaining -= cost
+            continue
+
+        if remaining >= MIN_BLOCK_TOKENS:
+            cut = block.text[:remaining * 4]
+            block.text = cut[:cut.rfind(" ")] if " " in cut else cut
+            packed.append(block)
+        break
+
+    return packed
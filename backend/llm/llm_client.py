@@ -1,38 +1,82 @@
 import os
+from typing import List
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+
+from backend.llm.backends import LLMBackend, create_backend
+from backend.llm.scheduler import LLMScheduler
+from backend.llm.router import LLMRouter
 
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("❌ GEMINI_API_KEY not found in .env file")
+# "gemini" (default), "openai" for an OpenAI-compatible server, or "fake" for
+# offline load tests. LLM_BACKENDS lists several in priority order
+# ("gemini,openai") to enable hedging and failover between them.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_BACKENDS = [
+    name.strip()
+    for name in os.getenv("LLM_BACKENDS", LLM_BACKEND).split(",")
+    if name.strip()
+]
+
+LLM_ERROR_MESSAGE = "An error occurred while generating the response."
+EMPTY_RESPONSE_MESSAGE = "The requested information is not available in the provided documents."
 
-client = genai.Client(api_key=GEMINI_API_KEY)
 
+# The error text a stream ends with when the backend failed part-way; still a
+# str for display, but callers can tell the answer is incomplete.
+class LLMErrorPiece(str):
+    pass
 
+
+# Calls go through an LLMScheduler per backend (rate limiting, retries,
+# coalescing) and, with several backends, an LLMRouter on top. Whatever
+# still fails is reported as LLM_ERROR_MESSAGE.
 class LLMClient:
-    def __init__(self):
-        self.model = "gemini-2.5-flash"
-        self.config = types.GenerateContentConfig(
-            temperature=0.2,
-            max_output_tokens=2048, 
-        )
+    def __init__(self, backends: List[LLMBackend] | None = None):
+        self.backends = backends or [create_backend(name) for name in LLM_BACKENDS]
+
+        schedulers = [LLMScheduler(backend) for backend in self.backends]
+        self.scheduler = schedulers[0] if len(schedulers) == 1 else LLMRouter(schedulers)
+
+    def _text(self, text: str) -> str:
+        if not text:
+            return EMPTY_RESPONSE_MESSAGE
+
+        return text.strip()
 
     def generate(self, prompt: str) -> str:
         try:
-            response = client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config=self.config,
-            )
+            return self._text(self.scheduler.generate(prompt))
+            
+        except Exception as e:
+            print(f"LLM Generation Error: {e!r}")
+            return LLM_ERROR_MESSAGE
+
+    # Non-blocking variant for async routes.
+    async def agenerate(self, prompt: str) -> str:
+        try:
+            return self._text(await self.scheduler.agenerate(prompt))
 
-            if not response or not response.text:
-                return "The requested information is not available in the provided documents."
+        except Exception as e:
+            print(f"LLM Generation Error: {e!r}")
+            return LLM_ERROR_MESSAGE
+
+    # Yields answer text pieces as the backend produces them.
+    async def astream(self, prompt: str):
+        emitted = False
+        try:
+            async for piece in self.scheduler.astream(prompt):
+                if piece:
+                    emitted = True
+                    yield piece
 
-            return response.text.strip()
-            
         except Exception as e:
-            print(f"LLM Generation Error: {e}")
-            return "An error occurred while generating the response."
\ No newline at end of file
+            print(f"LLM Generation Error: {e!r}")
+            yield LLMErrorPiece(("\n\n" if emitted else "") + LLM_ERROR_MESSAGE)
+            return
+
+        if not emitted:
+            yield EMPTY_RESPONSE_MESSAGE
+
+    def stats(self) -> dict:
+        return self.scheduler.stats()
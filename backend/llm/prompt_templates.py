@@ -1,30 +1,27 @@
 from typing import List
 from langchain_core.documents import Document
 
+from backend.llm.context_packer import pack_context
+
+SYSTEM_PROMPT = (
+    "You are an internal company assistant.\n"
+    "Use the provided context to answer the user's question.\n"
+    "If partial information is available, summarize what is present.\n"
+    "Be concise. Provide a summary if the answer is long.\n"
+    "Do NOT refuse to answer if the information is incomplete.\n"
+    "Do NOT add external knowledge.\n"
+    "Answer in clear bullet points.\n"
+)
+
 def build_prompt(query: str, documents: List[Document]) -> str:
     context = "\n\n".join(
-        f"[Source: {doc.metadata.get('source_path', 'Unknown')}]\n{doc.page_content.strip()}"
-        for doc in documents
+        f"[Source: {block.source}]\n{block.text}"
+        for block in pack_context(documents)
     )
 
-    SYSTEM_PROMPT = (
-        "You are an internal company assistant.\n"
-        "Use the provided context to answer the user's question.\n"
-        "If partial information is available, summarize what is present.\n"
-        "Be concise. Provide a summary if the answer is long.\n"
-        "Do NOT refuse to answer if the information is incomplete.\n"
-        "Do NOT add external knowledge.\n"
-        "Answer in clear bullet points.\n"
+    return (
+        f"{SYSTEM_PROMPT}\n"
+        f"### Context Data:\n{context}\n\n"
+        f"### User Question:\n{query}\n\n"
+        "### Answer:\n"
     )
-
-    return f"""
-            {SYSTEM_PROMPT}
-
-            ### Context Data:
-            {context}
-
-            ### User Question:
-            {query}
-
-            ### Answer:
-            """
\ No newline at end of file
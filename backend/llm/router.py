@@ -0,0 +1,258 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, List
+
+from backend.llm.scheduler import LLMScheduler
+from backend.metrics import LLM_CALLS
+
+# Send a second request to the next backend once the first has been running
+# longer than its own p95 (or LLM_HEDGE_DEFAULT_MS until enough samples).
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "200"))
+LLM_HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "3000"))
+LLM_HEDGE_MIN_SAMPLES = 20
+
+# A backend whose error rate over the last LLM_FAILOVER_WINDOW calls reaches
+# LLM_FAILOVER_ERROR_RATE is moved to the back for the cooldown.
+LLM_FAILOVER_ERROR_RATE = float(os.getenv("LLM_FAILOVER_ERROR_RATE", "0.5"))
+LLM_FAILOVER_WINDOW = int(os.getenv("LLM_FAILOVER_WINDOW", "20"))
+LLM_FAILOVER_MIN_CALLS = int(os.getenv("LLM_FAILOVER_MIN_CALLS", "10"))
+LLM_FAILOVER_COOLDOWN_SECONDS = float(os.getenv("LLM_FAILOVER_COOLDOWN_SECONDS", "30"))
+
+_LATENCY_WINDOW = 200
+
+
+class _Route:
+    def __init__(self, scheduler: LLMScheduler):
+        self.scheduler = scheduler
+        self.name = scheduler.backend.name
+        self.latencies = deque(maxlen=_LATENCY_WINDOW)
+        self.first_token = deque(maxlen=_LATENCY_WINDOW)
+        self.outcomes = deque(maxlen=LLM_FAILOVER_WINDOW)
+        self.unhealthy_until = 0.0
+        self.failovers = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    # Seconds to wait on this backend before hedging.
+    def hedge_after(self, samples) -> float:
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_MS / 1000
+        ordered = sorted(samples)
+        p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        return max(p95, LLM_HEDGE_MIN_MS / 1000)
+
+    def record(self, ok: bool):
+        # Calls that were already in flight when it tripped don't count.
+        if not self.healthy(time.monotonic()):
+            return
+
+        self.outcomes.append(ok)
+        if len(self.outcomes) < LLM_FAILOVER_MIN_CALLS:
+            return
+
+        error_rate = self.outcomes.count(False) / len(self.outcomes)
+        if error_rate >= LLM_FAILOVER_ERROR_RATE:
+            print(f"⚠️ LLM backend {self.name} failing ({error_rate:.0%}), failing over")
+            self.unhealthy_until = time.monotonic() + LLM_FAILOVER_COOLDOWN_SECONDS
+            self.failovers += 1
+            self.outcomes.clear()
+
+
+# Spreads calls over several backends in priority order. Each backend keeps
+# its own LLMScheduler, so rate limits and in-flight caps stay per provider.
+class LLMRouter:
+    def __init__(self, schedulers: List[LLMScheduler]):
+        self.routes = [_Route(s) for s in schedulers]
+        self._lock = threading.Lock()
+        self._stats = {"hedged": 0, "hedge_wins": 0, "fallbacks": 0}
+
+    # Healthy backends first, in configured order; unhealthy ones stay as a
+    # last resort.
+    def _order(self) -> List[_Route]:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [r for r in self.routes if r.healthy(now)]
+            return healthy + [r for r in self.routes if not r.healthy(now)]
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+        LLM_CALLS.labels(key).inc()
+
+    async def _call(self, route: _Route, prompt: str) -> str:
+        started = time.monotonic()
+        try:
+            text = await route.scheduler.agenerate(prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            with self._lock:
+                route.record(False)
+            raise
+
+        with self._lock:
+            route.latencies.append(time.monotonic() - started)
+            route.record(True)
+        return text
+
+    def generate(self, prompt: str) -> str:
+        # Sync callers run outside any event loop (RAGPipeline.run in a thread).
+        return asyncio.run(self.agenerate(prompt))
+
+    async def agenerate(self, prompt: str) -> str:
+        remaining = self._order()
+        pending = {}
+        error = None
+        hedged = False
+
+        def launch():
+            route = remaining.pop(0)
+            pending[asyncio.ensure_future(self._call(route, prompt))] = route
+
+        launch()
+        primary = next(iter(pending.values()))
+        try:
+            while pending:
+                timeout = None
+                if LLM_HEDGING_ENABLED and remaining and not hedged:
+                    timeout = primary.hedge_after(primary.latencies)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedged = True
+                    self._count("hedged")
+                    launch()
+                    continue
+
+                for task in done:
+                    route = pending.pop(task)
+                    if task.exception() is None:
+                        if route is not primary and hedged:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+
+                # Everything launched so far failed: try the next backend.
+                if not pending and remaining:
+                    self._count("fallbacks")
+                    launch()
+
+            raise error
+        finally:
+            # Cancels the losing hedge; the scheduler drops its upstream call.
+            for task in pending:
+                task.cancel()
+
+    # Opens a stream and waits for its first piece. Returns (None, iterator)
+    # for an empty stream.
+    async def _first_piece(self, route: _Route, prompt: str):
+        started = time.monotonic()
+        stream = route.scheduler.astream(prompt)
+        try:
+            piece = await stream.__anext__()
+        except StopAsyncIteration:
+            piece = None
+        except asyncio.CancelledError:
+            await stream.aclose()
+            raise
+        except Exception:
+            with self._lock:
+                route.record(False)
+            raise
+
+        with self._lock:
+            route.first_token.append(time.monotonic() - started)
+        return piece, stream
+
+    # Hedges on time to first token; once a backend has produced a piece,
+    # the rest of the answer comes from it alone.
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        remaining = self._order()
+        pending = {}
+        error = None
+        hedged = False
+        winner = None
+
+        def launch():
+            route = remaining.pop(0)
+            pending[asyncio.ensure_future(self._first_piece(route, prompt))] = route
+
+        launch()
+        primary = next(iter(pending.values()))
+        try:
+            while pending and winner is None:
+                timeout = None
+                if LLM_HEDGING_ENABLED and remaining and not hedged:
+                    timeout = primary.hedge_after(primary.first_token)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedged = True
+                    self._count("hedged")
+                    launch()
+                    continue
+
+                for task in done:
+                    route = pending.pop(task)
+                    if winner is None and task.exception() is None:
+                        winner = route, task.result()
+                    elif task.exception() is not None:
+                        error = task.exception()
+                    else:
+                        # A second stream finished opening in the same tick.
+                        await task.result()[1].aclose()
+
+                if winner is None and not pending and remaining:
+                    self._count("fallbacks")
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if winner is None:
+            raise error
+
+        route, (piece, stream) = winner
+        if route is not primary and hedged:
+            self._count("hedge_wins")
+
+        failed = False
+        try:
+            if piece is not None:
+                yield piece
+            async for piece in stream:
+                yield piece
+        except Exception:
+            failed = True
+            raise
+        finally:
+            await stream.aclose()
+            with self._lock:
+                route.record(not failed)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["backends"] = [
+                {
+                    "name": r.name,
+                    "healthy": r.healthy(now),
+                    "failovers": r.failovers,
+                    "hedge_after_ms": round(r.hedge_after(r.latencies) * 1000, 1),
+                    **r.scheduler.stats(),
+                }
+                for r in self.routes
+            ]
+        return stats
@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict
+
+from backend.llm.backends import LLMBackend
+from backend.metrics import LLM_CALLS, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, observe_stage
+
+# Upstream call budget shared by every request in this process.
+LLM_RATE_LIMIT_RPS = float(os.getenv("LLM_RATE_LIMIT_RPS", "10"))
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "20"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+# Per attempt, and for the whole call including queueing and retries.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_MS = float(os.getenv("LLM_RETRY_BASE_MS", "250"))
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    # backends.LLMBackendError and google-genai's APIError carry the HTTP status.
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    # Seconds until a token is available (0 if one was taken).
+    def take(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+# Every upstream call runs on one private event loop so sync callers
+# (RAGPipeline.run), the FastAPI loop and the retrieval threads share one
+# rate limit, one in-flight cap and one table of coalesced prompts.
+class LLMScheduler:
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self._bucket = _TokenBucket(LLM_RATE_LIMIT_RPS, LLM_RATE_LIMIT_BURST)
+        self._inflight: Dict[str, list] = {}
+        self._stats = {"queued": 0, "in_flight": 0, "retries": 0, "coalesced": 0, "timeouts": 0}
+
+        self._loop = asyncio.new_event_loop()
+        self._slots = None
+        threading.Thread(
+            target=self._loop.run_forever,
+            name="llm-scheduler",
+            daemon=True,
+        ).start()
+
+    # --- public API, callable from any thread or loop ---
+
+    def generate(self, prompt: str) -> str:
+        return asyncio.run_coroutine_threadsafe(self._coalesced(prompt), self._loop).result()
+
+    async def agenerate(self, prompt: str) -> str:
+        # Cancelling the awaiting task withdraws this caller from the
+        # (possibly shared) upstream call.
+        future = asyncio.run_coroutine_threadsafe(self._coalesced(prompt), self._loop)
+        return await asyncio.wrap_future(future)
+
+    # Streams are not coalesced, and are only retried before the first piece.
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        caller = asyncio.get_running_loop()
+        pieces: asyncio.Queue = asyncio.Queue()
+
+        def emit(kind, value=None):
+            caller.call_soon_threadsafe(pieces.put_nowait, (kind, value))
+
+        future = asyncio.run_coroutine_threadsafe(self._stream(prompt, emit), self._loop)
+        try:
+            while True:
+                kind, value = await pieces.get()
+                if kind == "piece":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["backend"] = self.backend.name
+        stats["rate_limit_rps"] = LLM_RATE_LIMIT_RPS
+        stats["max_in_flight"] = LLM_MAX_IN_FLIGHT
+        return stats
+
+    # --- scheduler loop ---
+
+    async def _coalesced(self, prompt: str) -> str:
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = self._loop.create_task(self._call(prompt))
+            entry = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _, entry=entry: self._forget(key, entry))
+        else:
+            self._stats["coalesced"] += 1
+            LLM_CALLS.labels("coalesced").inc()
+
+        # Shielded so one caller giving up doesn't cancel the others; the
+        # upstream call is cancelled once nobody is waiting for it.
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                # Unpublished first: the task only finishes cancelling on a
+                # later loop pass, and a caller arriving before then must
+                # start a fresh call rather than inherit the cancellation.
+                self._forget(key, entry)
+                entry[0].cancel()
+
+    def _forget(self, key: str, entry: list):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    async def _admit(self, deadline: float):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(LLM_MAX_IN_FLIGHT)
+
+        started = time.monotonic()
+        self._stats["queued"] += 1
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            while True:
+                wait = self._bucket.take()
+                if wait == 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise asyncio.TimeoutError("LLM rate limit wait exceeds deadline")
+                await asyncio.sleep(wait)
+
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(deadline - time.monotonic(), 0))
+        finally:
+            self._stats["queued"] -= 1
+            LLM_QUEUE_DEPTH.dec()
+            observe_stage("llm_queue_wait", time.monotonic() - started)
+
+        self._stats["in_flight"] += 1
+        LLM_IN_FLIGHT.inc()
+
+    def _release(self):
+        self._slots.release()
+        self._stats["in_flight"] -= 1
+        LLM_IN_FLIGHT.dec()
+
+    # Full-jitter exponential backoff, or None when the deadline won't allow it.
+    def _backoff(self, attempt: int, deadline: float):
+        delay = random.uniform(0, LLM_RETRY_BASE_MS / 1000 * 2 ** attempt)
+        if attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        return max(min(LLM_TIMEOUT_SECONDS, deadline - time.monotonic()), 0)
+
+    def _failed(self, error: Exception):
+        timed_out = isinstance(error, asyncio.TimeoutError)
+        if timed_out:
+            self._stats["timeouts"] += 1
+        LLM_CALLS.labels("timeout" if timed_out else "error").inc()
+
+    async def _call(self, prompt: str) -> str:
+        deadline = time.monotonic() + LLM_DEADLINE_SECONDS
+        attempt = 0
+
+        while True:
+            try:
+                await self._admit(deadline)
+                try:
+                    text = await asyncio.wait_for(
+                        self.backend.agenerate(prompt),
+                        timeout=self._attempt_timeout(deadline),
+                    )
+                finally:
+                    self._release()
+
+            except Exception as error:
+                delay = self._backoff(attempt, deadline) if _retryable(error) else None
+                if delay is None:
+                    self._failed(error)
+                    raise
+
+                attempt += 1
+                self._stats["retries"] += 1
+                LLM_CALLS.labels("retry").inc()
+                await asyncio.sleep(delay)
+                continue
+
+            LLM_CALLS.labels("ok").inc()
+            return text
+
+    async def _stream(self, prompt: str, emit):
+        deadline = time.monotonic() + LLM_DEADLINE_SECONDS
+        attempt = 0
+        started = False
+
+        while True:
+            try:
+                await self._admit(deadline)
+                try:
+                    pieces = self.backend.astream(prompt).__aiter__()
+                    while True:
+                        try:
+                            piece = await asyncio.wait_for(
+                                pieces.__anext__(),
+                                timeout=self._attempt_timeout(deadline),
+                            )
+                        except StopAsyncIteration:
+                            break
+                        started = True
+                        emit("piece", piece)
+                finally:
+                    self._release()
+
+            except Exception as error:
+                delay = None
+                if not started and _retryable(error):
+                    delay = self._backoff(attempt, deadline)
+                if delay is None:
+                    self._failed(error)
+                    emit("error", error)
+                    return
+
+                attempt += 1
+                self._stats["retries"] += 1
+                LLM_CALLS.labels("retry").inc()
+                await asyncio.sleep(delay)
+                continue
+
+            LLM_CALLS.labels("ok").inc()
+            emit("done")
+            return
@@ -1,14 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from pathlib import Path
+import threading
+import time
 import os
 from dotenv import load_dotenv
 
 from backend.routes import auth_routes, chat_routes
 from backend.routes.user_routes import router as user_router
+from backend.rag.rag_pipeline import rag_pipeline
 
 from backend.db.database import SessionLocal, engine, Base
 from backend.db.models import UserDB
 from backend.auth.password_utils import hash_password
+from backend.metrics import (
+    REQUEST_SECONDS,
+    SERVER_TIMING_ENABLED,
+    render_metrics,
+    server_timing_header,
+    start_request,
+)
 
 load_dotenv()
 
@@ -53,6 +64,21 @@ def ensure_default_admin():
     finally:
         db.close()
 
+_readiness = {"ready": False, "error": None, "warmup_seconds": None}
+
+def warm_up():
+    started = time.perf_counter()
+    try:
+        rag_pipeline.warm_up()
+    except Exception as e:
+        print(f"❌ Warm-up failed: {e}")
+        _readiness["error"] = str(e)
+        return
+
+    _readiness["warmup_seconds"] = round(time.perf_counter() - started, 2)
+    _readiness["ready"] = True
+    print(f"✅ Vector store warm ({_readiness['warmup_seconds']}s).\n")
+
 @app.on_event("startup")
 def startup_event():
     print("\n🚀 Backend starting...\n")
@@ -60,10 +86,34 @@ def startup_event():
     Base.metadata.create_all(bind=engine)
     ensure_default_admin()
 
+    # Warm in the background so "/" answers immediately; "/ready" flips once done.
     print("📦 Loading existing vector store only (no rebuild)...\n")
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
     print("✅ Startup complete.\n")
 
 
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    timings = start_request()
+    started = time.perf_counter()
+
+    response = await call_next(request)
+
+    # Route templates keep label cardinality bounded (/users/{username}).
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(
+        request.method,
+        route.path if route is not None else "unmatched",
+        str(response.status_code),
+    ).observe(time.perf_counter() - started)
+
+    # For streaming responses both cover the time up to the headers only.
+    if SERVER_TIMING_ENABLED and timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+
+    return response
+
+
 app.include_router(auth_routes.router)
 app.include_router(chat_routes.router)
 app.include_router(user_router)
@@ -72,3 +122,17 @@ app.include_router(user_router)
 @app.get("/")
 def health():
     return {"status": "Backend is running"}
+
+
+@app.get("/ready")
+def ready():
+    if not _readiness["ready"]:
+        status = "failed" if _readiness["error"] else "warming up"
+        return JSONResponse(status_code=503, content={"status": status, **_readiness})
+    return {"status": "ready", **_readiness}
+
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,143 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+# Adds a Server-Timing header with the stages each request went through.
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# Set when running several uvicorn workers; each worker writes its samples
+# there and /metrics aggregates them.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+REQUEST_SECONDS = Histogram(
+    "intrabot_request_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+STAGE_SECONDS = Histogram(
+    "intrabot_stage_seconds",
+    "Latency of individual request stages (embedding, search, LLM, bcrypt...).",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+LLM_TOKENS = Histogram(
+    "intrabot_llm_tokens",
+    "Estimated prompt and completion tokens per LLM call.",
+    ["kind"],
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+
+RETRIEVED_CHUNKS = Histogram(
+    "intrabot_retrieved_chunks",
+    "Chunks passed to the LLM per question; 0 means it was answered without one.",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 20),
+)
+
+CACHE_REQUESTS = Counter(
+    "intrabot_cache_requests_total",
+    "Cache lookups by cache and outcome.",
+    ["cache", "result"],
+)
+
+CACHE_EVICTIONS = Counter(
+    "intrabot_cache_evictions_total",
+    "Entries evicted to make room, by cache.",
+    ["cache"],
+)
+
+LLM_QUEUE_DEPTH = Gauge(
+    "intrabot_llm_queue_depth",
+    "LLM calls waiting for a rate-limit token or an in-flight slot.",
+    multiprocess_mode="livesum",
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "intrabot_llm_in_flight",
+    "LLM calls currently sent upstream.",
+    multiprocess_mode="livesum",
+)
+
+LLM_CALLS = Counter(
+    "intrabot_llm_calls_total",
+    "LLM call events: ok, retry, error, timeout, coalesced, hedged, hedge_wins, fallbacks.",
+    ["outcome"],
+)
+
+# Stage -> seconds for the request being served, shared with the threads it
+# offloads to (anyio and RAGPipeline copy the context into their workers).
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_cache_eviction(cache: str):
+    CACHE_EVICTIONS.labels(cache).inc()
+
+
+def record_tokens(kind: str, count: int):
+    LLM_TOKENS.labels(kind).observe(count)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}"
+        for stage, seconds in timings.items()
+    )
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,412 @@
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from backend.rag.rbac import ROLES, role_bit, role_mask, role_metadata_key
+
+# In-process alternative to Chroma (VECTOR_STORE_BACKEND=numpy|hnsw). Like the
+# lexical index, each save goes to ANN_DIR/<build_id>/ and ANN_DIR/CURRENT
+# names the live build. A build directory holds:
+#   meta.json     -> {"roles", "dim", "count", "model"}
+#   vectors.f32   -> float32 [count, dim] embeddings, memory-mapped on load
+#   role_mask.npy -> uint8 bitmask of roles allowed to see each row
+#   docs.jsonl    -> chunk text and metadata, one line per row
+#   hnsw.bin      -> optional hnswlib graph over the same rows
+#
+# Distances are squared L2, the same as Chroma's default, so relevance
+# thresholds carry over between backends.
+
+_HNSW_M = 16
+_HNSW_EF_CONSTRUCTION = 200
+_HNSW_EF_SEARCH = 64
+# Spare capacity added when appending runs out, so building n rows copies
+# O(n) data in total.
+_GROWTH = 1.5
+_MIN_CAPACITY = 1024
+
+
+def _role_from_filter(filter: Optional[dict]) -> Optional[int]:
+    # Only the retriever's role_filter() shape is supported: {"role_<name>": True}.
+    if not filter:
+        return None
+    for role in ROLES:
+        if filter.get(role_metadata_key(role)) is True and len(filter) == 1:
+            return role_bit(role)
+    raise ValueError(f"Unsupported filter for the in-memory vector store: {filter}")
+
+
+class AnnVectorStore:
+    def __init__(self, root: Path, embedding_function, index: str = "numpy", model: str = ""):
+        self.root = root
+        self.embedding_function = embedding_function
+        self.index = index
+        self.model = model
+
+        self.dim = 0
+        self._use_buffers(
+            np.zeros((0, 0), dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.uint8),
+        )
+        self.docs: List[dict] = []
+        self.rows: Dict[str, int] = {}
+        self.build_id: Optional[str] = None
+
+        self._hnsw = None
+        self._lock = threading.RLock()
+        self.dirty = False
+
+    # --- loading and saving ---
+
+    @classmethod
+    def load(cls, root: Path, build_id: str, embedding_function, index: str = "numpy"):
+        store = cls(root, embedding_function, index=index)
+        store._read(build_id)
+        return store
+
+    # vectors/norms/role_mask are views over the first len(docs) rows of
+    # these buffers; appends fill the spare rows and then widen the views.
+    def _use_buffers(self, vectors, norms, role_mask, count=None):
+        self._vector_buf, self._norm_buf, self._mask_buf = vectors, norms, role_mask
+        count = len(vectors) if count is None else count
+        self.vectors = vectors[:count]
+        self.norms = norms[:count]
+        self.role_mask = role_mask[:count]
+
+    def _append(self, vectors: np.ndarray, masks: np.ndarray):
+        start = len(self.vectors)
+        end = start + len(vectors)
+        if end > len(self._vector_buf):
+            capacity = max(end, int(len(self._vector_buf) * _GROWTH), _MIN_CAPACITY)
+            vector_buf = np.empty((capacity, self.dim), dtype=np.float32)
+            norm_buf = np.empty(capacity, dtype=np.float32)
+            mask_buf = np.zeros(capacity, dtype=np.uint8)
+            vector_buf[:start] = self.vectors
+            norm_buf[:start] = self.norms
+            mask_buf[:start] = self.role_mask
+            self._use_buffers(vector_buf, norm_buf, mask_buf, start)
+
+        self._vector_buf[start:end] = vectors
+        self._norm_buf[start:end] = np.einsum("ij,ij->i", vectors, vectors)
+        self._mask_buf[start:end] = masks
+        # Readers keep the shorter views they snapshotted.
+        self._use_buffers(self._vector_buf, self._norm_buf, self._mask_buf, end)
+
+    def _read(self, build_id: str, hnsw=None):
+        directory = self.root / build_id
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta["roles"] != ROLES:
+            raise RuntimeError("Vector index was built for a different role map; rebuild it.")
+
+        self.model = meta.get("model", "")
+        self.dim = meta["dim"]
+        if meta["count"]:
+            # Copy-on-write: in-process upserts never touch the saved file.
+            vectors = np.memmap(
+                directory / "vectors.f32",
+                dtype=np.float32,
+                mode="c",
+                shape=(meta["count"], meta["dim"]),
+            )
+        else:
+            vectors = np.zeros((0, meta["dim"]), dtype=np.float32)
+        self._use_buffers(
+            vectors,
+            np.einsum("ij,ij->i", vectors, vectors),
+            np.load(directory / "role_mask.npy"),
+        )
+
+        with open(directory / "docs.jsonl", encoding="utf-8") as f:
+            self.docs = [json.loads(line) for line in f]
+        self.rows = {doc["metadata"]["chunk_id"]: i for i, doc in enumerate(self.docs)}
+
+        self._hnsw = hnsw
+        if self._hnsw is None and self.index == "hnsw" and meta["count"]:
+            self._load_hnsw(directory / "hnsw.bin")
+
+        self.build_id = build_id
+        self.dirty = False
+
+    # Writes the live rows (deleted ones are compacted away) as a new build.
+    def save(self):
+        with self._lock:
+            live = sorted(self.rows.values())
+            build_id = f"{time.time_ns()}"
+            directory = self.root / build_id
+            directory.mkdir(parents=True, exist_ok=True)
+
+            vectors = np.asarray(self.vectors[live], dtype=np.float32) if live else \
+                np.zeros((0, self.dim), dtype=np.float32)
+            vectors.tofile(directory / "vectors.f32")
+            np.save(directory / "role_mask.npy", np.asarray(self.role_mask[live], dtype=np.uint8))
+            with open(directory / "docs.jsonl", "w", encoding="utf-8") as f:
+                for i in live:
+                    f.write(json.dumps(self.docs[i]) + "\n")
+            (directory / "meta.json").write_text(
+                json.dumps({
+                    "roles": ROLES,
+                    "dim": self.dim,
+                    "count": len(live),
+                    "model": self.model,
+                }),
+                encoding="utf-8",
+            )
+
+            # Without tombstones the row numbers survive compaction and the
+            # graph maintained by add_documents is saved as it is. Otherwise
+            # it is rebuilt, which also drops the deleted nodes.
+            graph = None
+            if self.index == "hnsw" and len(live):
+                if self._hnsw is not None and len(live) == len(self.docs):
+                    graph = self._hnsw
+                else:
+                    graph = self._build_hnsw(vectors)
+                graph.save_index(str(directory / "hnsw.bin"))
+
+            pointer = self.root / "CURRENT.tmp"
+            pointer.write_text(build_id, encoding="utf-8")
+            pointer.replace(self.root / "CURRENT")
+
+            # Keep the previous build for readers that are still loading it.
+            builds = sorted(
+                (d for d in self.root.iterdir() if d.is_dir()),
+                key=lambda d: int(d.name) if d.name.isdigit() else 0,
+            )
+            for old in builds[:-2]:
+                shutil.rmtree(old, ignore_errors=True)
+
+            # Continue from the compacted copy so row numbers match the build.
+            self._read(build_id, hnsw=graph)
+
+    # --- HNSW (optional, needs hnswlib) ---
+
+    def _build_hnsw(self, vectors: np.ndarray, capacity: int = 0):
+        import hnswlib
+
+        graph = hnswlib.Index(space="l2", dim=self.dim)
+        graph.init_index(
+            max_elements=max(len(vectors), capacity, 1),
+            ef_construction=_HNSW_EF_CONSTRUCTION,
+            M=_HNSW_M,
+        )
+        graph.add_items(vectors, np.arange(len(vectors)))
+        graph.set_ef(_HNSW_EF_SEARCH)
+        return graph
+
+    def _load_hnsw(self, path: Path):
+        if path.exists():
+            import hnswlib
+
+            graph = hnswlib.Index(space="l2", dim=self.dim)
+            graph.load_index(str(path), max_elements=len(self.vectors))
+            graph.set_ef(_HNSW_EF_SEARCH)
+            self._hnsw = graph
+        else:
+            self._hnsw = self._build_hnsw(np.asarray(self.vectors))
+
+    # --- Chroma-compatible write API used by vector_store ---
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        if not documents:
+            return
+        ids = ids or [doc.metadata["chunk_id"] for doc in documents]
+        embedded = np.asarray(
+            self.embedding_function.embed_documents([doc.page_content for doc in documents]),
+            dtype=np.float32,
+        )
+
+        with self._lock:
+            if not self.dim:
+                self.dim = embedded.shape[1]
+                self._use_buffers(
+                    np.zeros((0, self.dim), dtype=np.float32),
+                    self._norm_buf,
+                    self._mask_buf,
+                )
+
+            new_rows = []
+            for chunk_id, doc, vector in zip(ids, documents, embedded):
+                row = self.rows.get(chunk_id)
+                record = {"text": doc.page_content, "metadata": doc.metadata}
+                mask = role_mask(doc.metadata)
+                if row is None:
+                    new_rows.append((chunk_id, record, vector, mask))
+                    continue
+                # Overwrite in place (the memmap is copy-on-write).
+                self.vectors[row] = vector
+                self.norms[row] = float(vector @ vector)
+                self.role_mask[row] = mask
+                self.docs[row] = record
+                if self._hnsw is not None:
+                    # hnswlib updates an existing label in place.
+                    self._hnsw.add_items(vector[None, :], [row])
+
+            if new_rows:
+                start = len(self.docs)
+                block = np.stack([r[2] for r in new_rows])
+                self._append(block, np.asarray([r[3] for r in new_rows], dtype=np.uint8))
+                for offset, (chunk_id, record, _, _) in enumerate(new_rows):
+                    self.docs.append(record)
+                    self.rows[chunk_id] = start + offset
+
+                if self.index == "hnsw":
+                    capacity = len(self._vector_buf)
+                    if self._hnsw is None:
+                        self._hnsw = self._build_hnsw(np.asarray(self.vectors), capacity)
+                    else:
+                        # Grown along with the buffers, not on every batch.
+                        if self._hnsw.get_max_elements() < len(self.docs):
+                            self._hnsw.resize_index(capacity)
+                        self._hnsw.add_items(block, np.arange(start, len(self.docs)))
+
+            self.dirty = True
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            for chunk_id in ids:
+                row = self.rows.pop(chunk_id, None)
+                if row is None:
+                    continue
+                # Tombstone: no role can see it; save() compacts it away.
+                self.role_mask[row] = 0
+                if self._hnsw is not None:
+                    self._hnsw.mark_deleted(row)
+            self.dirty = True
+
+    # --- search ---
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 5,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        bit = _role_from_filter(filter)
+        query = np.asarray(embedding, dtype=np.float32)
+        if k <= 0:
+            return []
+
+        if self._hnsw is not None:
+            # hnswlib can't search while items are being added.
+            with self._lock:
+                docs = self.docs
+                rows, distances = self._search_hnsw(query, k, bit)
+        else:
+            # Writers append into spare buffer rows and then widen the views
+            # (see _append), so these views keep their length; upserts and
+            # deletes only change rows in place. That is enough for the exact
+            # search.
+            with self._lock:
+                docs, vectors, norms, mask = self.docs, self.vectors, self.norms, self.role_mask
+            rows, distances = _search_exact(vectors, norms, mask, query, k, bit)
+
+        return [
+            (
+                Document(page_content=docs[row]["text"], metadata=docs[row]["metadata"]),
+                float(distance),
+            )
+            for row, distance in zip(rows, distances)
+        ]
+
+    def _search_hnsw(self, query: np.ndarray, k: int, bit: Optional[int]):
+        mask = self.role_mask
+        if bit is None:
+            allowed = lambda row: mask[row] != 0
+        else:
+            allowed = lambda row: (mask[row] & bit) != 0
+
+        available = int(np.count_nonzero(mask if bit is None else mask & bit))
+        k = min(k, available)
+        if not k:
+            return [], []
+
+        self._hnsw.set_ef(max(_HNSW_EF_SEARCH, k))
+        try:
+            labels, distances = self._hnsw.knn_query(query, k=k, filter=allowed)
+        except RuntimeError:
+            # A very selective role filter can leave the graph walk short of
+            # k hits; the exact scan always finds them.
+            return _search_exact(self.vectors, self.norms, mask, query, k, bit)
+        return labels[0], distances[0]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+# One matrix-vector product over every row, then mask by role.
+def _search_exact(vectors, norms, mask, query: np.ndarray, k: int, bit: Optional[int]):
+    if not len(vectors):
+        return [], []
+
+    distances = norms - 2 * (vectors @ query) + float(query @ query)
+    allowed = mask != 0 if bit is None else (mask & bit) != 0
+    candidates = np.flatnonzero(allowed)
+    if not len(candidates):
+        return [], []
+
+    scores = distances[candidates]
+    if len(candidates) > k:
+        top = np.argpartition(scores, k - 1)[:k]
+        candidates, scores = candidates[top], scores[top]
+    order = np.argsort(scores)
+    return candidates[order], np.maximum(scores[order], 0.0)
+
+
+_store: Optional[AnnVectorStore] = None
+_store_key = None
+_lock = threading.Lock()
+
+
+def current_build(root: Path) -> Optional[str]:
+    pointer = root / "CURRENT"
+    if not pointer.exists():
+        return None
+    return pointer.read_text(encoding="utf-8").strip()
+
+
+# Reloads when another process (e.g. an ingest run) publishes a new build;
+# a store with unsaved in-process writes is kept.
+def get_ann_store(root: Path, embedding_function, index: str) -> Optional[AnnVectorStore]:
+    global _store, _store_key
+
+    build = current_build(root)
+    store = _store
+    if store is not None and _store_key == (root, index) and (store.dirty or store.build_id == build):
+        return store
+
+    with _lock:
+        if build is not None and (
+            _store is None
+            or _store_key != (root, index)
+            or (_store.build_id != build and not _store.dirty)
+        ):
+            _store = AnnVectorStore.load(root, build, embedding_function, index)
+            _store_key = (root, index)
+    return _store
+
+
+# A fresh, empty store that becomes the live one once saved.
+def new_ann_store(root: Path, embedding_function, index: str, model: str) -> AnnVectorStore:
+    global _store, _store_key
+
+    root.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        _store = AnnVectorStore(root, embedding_function, index=index, model=model)
+        _store.dirty = True
+        _store_key = (root, index)
+    return _store
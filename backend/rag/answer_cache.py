@@ -0,0 +1,139 @@
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+# Cosine similarity above which a different question reuses a cached answer.
+# Off (0) by default: questions differing only in a year, quarter or ID embed
+# almost identically. Set e.g. 0.97 only after checking on real traffic.
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.rstrip("?!. ")
+
+
+class _Entry:
+    __slots__ = ("result", "embedding", "expires_at", "version")
+
+    def __init__(self, result, embedding, expires_at, version):
+        self.result = result
+        self.embedding = embedding
+        self.expires_at = expires_at
+        self.version = version
+
+
+# Answers are cached per role, so a role can never see another role's answer.
+class AnswerCache:
+    def __init__(
+        self,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        version: Callable[[], object] = lambda: None,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY,
+    ):
+        self.embed = embed
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+
+    def _semantic(self) -> bool:
+        return self.embed is not None and self.similarity_threshold > 0
+
+    # Callers that already embedded the query (batches) pass the vector in.
+    def _embedding(self, query: str, embedding=None) -> Optional[np.ndarray]:
+        if not self._semantic():
+            return None
+        if embedding is None:
+            embedding = self.embed(query)
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _valid(self, entry: _Entry, now: float, version) -> bool:
+        return entry.expires_at > now and entry.version == version
+
+    def get(self, role: str, query: str, embedding=None) -> Optional[Dict]:
+        key = (role, normalize_query(query))
+        now = time.monotonic()
+        version = self.version()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._valid(entry, now, version):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry.result)
+                del self._entries[key]
+
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if k[0] == role and e.embedding is not None and self._valid(e, now, version)
+            ]
+
+        if candidates and self._semantic():
+            vector = self._embedding(query, embedding)
+            matrix = np.stack([e.embedding for _, e in candidates])
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+
+            if scores[best] >= self.similarity_threshold:
+                best_key, best_entry = candidates[best]
+                with self._lock:
+                    if best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    self.semantic_hits += 1
+                return copy.deepcopy(best_entry.result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, role: str, query: str, result: Dict, embedding=None):
+        key = (role, normalize_query(query))
+        entry = _Entry(
+            result=copy.deepcopy(result),
+            embedding=self._embedding(query, embedding),
+            expires_at=time.monotonic() + self.ttl_seconds,
+            version=self.version(),
+        )
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
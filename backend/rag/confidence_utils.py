@@ -1,6 +1,21 @@
 from typing import List, Tuple
 from langchain_core.documents import Document
 
+# Exact lexical hits (identifier lookups) have no vector distance. They carry
+# this neutral stand-in (confidence 0.5) and a "match" flag so distance-based
+# selection leaves them alone.
+LEXICAL_MATCH_DISTANCE = 1.0
+
+
+def mark_lexical_match(doc: Document) -> Document:
+    # A copy: the lexical index hands out its own Document objects.
+    return Document(page_content=doc.page_content, metadata={**doc.metadata, "match": "lexical"})
+
+
+def is_lexical_match(doc: Document) -> bool:
+    return doc.metadata.get("match") == "lexical"
+
+
 # Confidence based on similarity scores. Lower distance = higher relevance.
 def calculate_confidence_from_scores(
     results: List[Tuple[Document, float]],
@@ -15,3 +30,46 @@ def calculate_confidence_from_scores(
     avg_score = sum(relevance_scores) / len(relevance_scores)
 
     return round(min(avg_score, 1.0), 2)
+
+
+# Chooses how many results are worth sending to the LLM. Exact lexical
+# matches are always kept. For plain vector results (best distance first),
+# drops anything farther than max_distance, then cuts at the first gap
+# between consecutive distances wider than cliff_gap (keeping at least
+# min_k). When the order comes from fusion or re-ranking (`ranked`), the
+# distances are out of order and lexical-only hits carry stand-ins, so the
+# cut is by rank instead: everything up to the last hit within max_distance.
+def select_relevant(
+    results: List[Tuple[Document, float]],
+    max_distance: float,
+    cliff_gap: float,
+    min_k: int = 1,
+    ranked: bool = False,
+) -> List[Tuple[Document, float]]:
+
+    if ranked:
+        last = -1
+        for i, (doc, score) in enumerate(results):
+            if score <= max_distance and not is_lexical_match(doc):
+                last = i
+        return [
+            (doc, score) for i, (doc, score) in enumerate(results)
+            if i <= last or is_lexical_match(doc)
+        ]
+
+    kept = [
+        (doc, score) for doc, score in results
+        if score <= max_distance and not is_lexical_match(doc)
+    ]
+    cutoff = max((score for _, score in kept), default=0.0)
+    if len(kept) > min_k:
+        distances = sorted(score for _, score in kept)
+        for i in range(max(min_k, 1), len(distances)):
+            if distances[i] - distances[i - 1] > cliff_gap:
+                cutoff = distances[i - 1]
+                break
+
+    return [
+        (doc, score) for doc, score in results
+        if is_lexical_match(doc) or (score <= max_distance and score <= cutoff)
+    ]
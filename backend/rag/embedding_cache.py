@@ -0,0 +1,198 @@
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.metrics import record_cache, record_cache_eviction
+
+# On-disk layout inside CACHE_DIR:
+#   meta.json    -> {"model", "dim", "capacity"}
+#   keys.u8      -> capacity x 32 bytes, sha256 of the text stored in each slot
+#   vectors.f32  -> capacity x dim float32 embeddings
+# The key file is the source of truth: a slot is only a hit when its stored
+# digest matches, so a slot overwritten by another process is just a miss.
+# Writers clear the digest, write the vector, then publish the new digest;
+# readers re-check the digest after copying the vector.
+
+_KEY_BYTES = 32
+_EMPTY_KEY = np.zeros(_KEY_BYTES, dtype=np.uint8)
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        base: Embeddings,
+        cache_dir: Path,
+        model_name: str,
+        max_entries: int = 20000,
+        flush_interval: float = 5.0,
+    ):
+        self.base = base
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.capacity = max_entries
+        # Misses are msync'ed at most this often (and at ingest end and exit);
+        # other processes see writes through the page cache straight away.
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._keys = None
+        self._vectors = None
+        self._index: "OrderedDict[bytes, int]" = OrderedDict()
+        self._free: List[int] = []
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._open_existing()
+        atexit.register(self.flush)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    def _open_existing(self):
+        meta_path = self.cache_dir / "meta.json"
+        if not meta_path.exists():
+            return
+
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("model") != self.model_name or meta.get("capacity") != self.capacity:
+            return
+
+        self._map(meta["dim"], mode="r+")
+
+    def _map(self, dim: int, mode: str):
+        self._dim = dim
+        self._keys = np.memmap(
+            self.cache_dir / "keys.u8",
+            dtype=np.uint8,
+            mode=mode,
+            shape=(self.capacity, _KEY_BYTES),
+        )
+        self._vectors = np.memmap(
+            self.cache_dir / "vectors.f32",
+            dtype=np.float32,
+            mode=mode,
+            shape=(self.capacity, dim),
+        )
+
+        self._index.clear()
+        self._free = []
+        for slot in range(self.capacity):
+            key = self._keys[slot].tobytes()
+            if any(key):
+                self._index[key] = slot
+            else:
+                self._free.append(slot)
+        self._free.reverse()
+
+    def _create(self, dim: int):
+        (self.cache_dir / "meta.json").write_text(
+            json.dumps({"model": self.model_name, "dim": dim, "capacity": self.capacity}),
+            encoding="utf-8",
+        )
+        self._map(dim, mode="w+")
+
+    def _lookup(self, key: bytes) -> Optional[List[float]]:
+        slot = self._index.get(key)
+        if slot is None:
+            return None
+        stored = self._keys[slot].tobytes()
+        if stored != key:
+            # Another process reused this slot; track what it holds now.
+            del self._index[key]
+            self._index[stored] = slot
+            return None
+
+        vector = self._vectors[slot].tolist()
+        if self._keys[slot].tobytes() != key:
+            # Overwritten while we were copying it.
+            del self._index[key]
+            return None
+
+        self._index.move_to_end(key)
+        return vector
+
+    def _store(self, key: bytes, vector: List[float]):
+        if self._vectors is None:
+            self._create(len(vector))
+
+        if key in self._index:
+            slot = self._index.pop(key)
+        elif self._free:
+            slot = self._free.pop()
+        else:
+            # Least recently used entry makes room for the new one.
+            _, slot = self._index.popitem(last=False)
+            self.evictions += 1
+            record_cache_eviction("embedding")
+
+        # Never let a digest sit next to someone else's vector.
+        self._keys[slot] = _EMPTY_KEY
+        self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+        self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+        self._index[key] = slot
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._lookup(key)
+                record_cache("embedding", cached is not None)
+                if cached is not None:
+                    results[i] = cached
+                    self.hits += 1
+                else:
+                    # Identical texts in one batch are embedded once.
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            todo = [texts[positions[0]] for positions in missing.values()]
+            vectors = self.base.embed_documents(todo)
+
+            with self._lock:
+                for (key, positions), vector in zip(missing.items(), vectors):
+                    self._store(key, vector)
+                    self.misses += 1
+                    self.hits += len(positions) - 1
+                    for i in positions:
+                        results[i] = list(vector)
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    self.flush()
+
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def flush(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._keys.flush()
+        self._last_flush = time.monotonic()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._index),
+            "capacity": self.capacity,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
@@ -0,0 +1,32 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict
+
+from backend.rag.vector_store import DATA_DIR, store_generation
+
+MANIFEST_PATH = DATA_DIR / "ingest_manifest.json"
+
+# Manifest layout: {relative_path: {"hash", "department", "chunk_ids"}}
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest() -> Dict[str, Dict]:
+    if not MANIFEST_PATH.exists():
+        return {}
+    return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+
+def save_manifest(manifest: Dict[str, Dict]):
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(MANIFEST_PATH)
+
+# Changes whenever the store is rebuilt, in this process or by a separate ingest run.
+def store_version():
+    mtime = MANIFEST_PATH.stat().st_mtime_ns if MANIFEST_PATH.exists() else 0
+    return (store_generation(), mtime)
@@ -0,0 +1,202 @@
+import json
+import math
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from backend.rag.rbac import ROLES, role_bit, role_mask
+from backend.rag.vector_store import DATA_DIR
+
+# Each build is written to its own LEXICAL_DIR/<build_id>/ directory and
+# LEXICAL_DIR/CURRENT names the live one, so readers never see a half-written
+# index. A build directory holds:
+#   meta.json        -> {"roles", "avgdl"}
+#   vocab.json       -> {term: [start, end]} slices into the postings arrays
+#   postings_doc.npy -> uint32 doc index per posting, grouped by term
+#   postings_tf.npy  -> uint16 term frequency per posting
+#   doc_len.npy      -> uint32 token count per doc
+#   role_mask.npy    -> uint8 bitmask of roles allowed to see each doc
+#   docs.jsonl       -> chunk text and metadata, one line per doc index
+
+LEXICAL_DIR = DATA_DIR / "lexical"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+# Fed chunk by chunk during ingestion: text goes straight to disk and only
+# the postings are kept in memory until save().
+class LexicalIndexBuilder:
+    def __init__(self, root: Path = LEXICAL_DIR):
+        self.root = root
+        self.build_id = f"{time.time_ns()}"
+        self.directory = root / self.build_id
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._docs = open(self.directory / "docs.jsonl", "w", encoding="utf-8")
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._doc_len: List[int] = []
+        self._role_mask: List[int] = []
+
+    def add(self, doc: Document):
+        idx = len(self._doc_len)
+        tokens = tokenize(doc.page_content)
+
+        self._doc_len.append(len(tokens))
+        self._role_mask.append(role_mask(doc.metadata))
+        for term, tf in Counter(tokens).items():
+            self._postings.setdefault(term, []).append((idx, min(tf, 65535)))
+
+        self._docs.write(json.dumps({"text": doc.page_content, "metadata": doc.metadata}) + "\n")
+
+    def save(self):
+        self._docs.close()
+
+        vocab = {}
+        docs_col: List[int] = []
+        tf_col: List[int] = []
+        for term in sorted(self._postings):
+            start = len(docs_col)
+            for idx, tf in self._postings[term]:
+                docs_col.append(idx)
+                tf_col.append(tf)
+            vocab[term] = [start, len(docs_col)]
+
+        doc_len = np.asarray(self._doc_len, dtype=np.uint32)
+
+        np.save(self.directory / "postings_doc.npy", np.asarray(docs_col, dtype=np.uint32))
+        np.save(self.directory / "postings_tf.npy", np.asarray(tf_col, dtype=np.uint16))
+        np.save(self.directory / "doc_len.npy", doc_len)
+        np.save(self.directory / "role_mask.npy", np.asarray(self._role_mask, dtype=np.uint8))
+        (self.directory / "vocab.json").write_text(json.dumps(vocab), encoding="utf-8")
+        (self.directory / "meta.json").write_text(
+            json.dumps({
+                "roles": ROLES,
+                "avgdl": float(doc_len.mean()) if len(doc_len) else 0.0,
+            }),
+            encoding="utf-8",
+        )
+
+        pointer = self.root / "CURRENT.tmp"
+        pointer.write_text(self.build_id, encoding="utf-8")
+        pointer.replace(self.root / "CURRENT")
+
+        # Keep the previous build for readers that are still loading it.
+        builds = sorted(
+            (d for d in self.root.iterdir() if d.is_dir()),
+            key=lambda d: int(d.name) if d.name.isdigit() else 0,
+        )
+        for old in builds[:-2]:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+class LexicalIndex:
+    def __init__(self, directory: Path):
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta["roles"] != ROLES:
+            raise RuntimeError("Lexical index was built for a different role map; rebuild it.")
+
+        self.avgdl = meta["avgdl"] or 1.0
+        self.vocab: Dict[str, List[int]] = json.loads(
+            (directory / "vocab.json").read_text(encoding="utf-8")
+        )
+        self.postings_doc = np.load(directory / "postings_doc.npy", mmap_mode="r")
+        self.postings_tf = np.load(directory / "postings_tf.npy", mmap_mode="r")
+        self.doc_len = np.load(directory / "doc_len.npy")
+        self.role_mask = np.load(directory / "role_mask.npy")
+
+        with open(directory / "docs.jsonl", encoding="utf-8") as f:
+            self.documents = [
+                Document(page_content=row["text"], metadata=row["metadata"])
+                for row in map(json.loads, f)
+            ]
+
+        self._norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / self.avgdl)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def has_terms(self, terms: List[str]) -> bool:
+        return bool(terms) and all(term in self.vocab for term in terms)
+
+    # BM25 over the docs the role may see; returns (Document, score), best first.
+    def search(self, query: str, role: str, k: int) -> List[Tuple[Document, float]]:
+        n = len(self.documents)
+        terms = set(tokenize(query))
+        if not n or not terms or role not in ROLES:
+            return []
+
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            span = self.vocab.get(term)
+            if span is None:
+                continue
+            docs = self.postings_doc[span[0]:span[1]]
+            tf = self.postings_tf[span[0]:span[1]].astype(np.float32)
+            df = len(docs)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + self._norm[docs])
+
+        scores[(self.role_mask & role_bit(role)) == 0] = 0
+        hits = np.flatnonzero(scores > 0)
+        if not len(hits):
+            return []
+
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits])]
+
+        return [(self.documents[i], float(scores[i])) for i in hits]
+
+
+_index: Optional[LexicalIndex] = None
+_index_build = None
+_lock = threading.Lock()
+
+
+def _current_build() -> Optional[str]:
+    pointer = LEXICAL_DIR / "CURRENT"
+    if not pointer.exists():
+        return None
+    return pointer.read_text(encoding="utf-8").strip()
+
+
+# Reloads automatically when a new build goes live, e.g. from a separate ingest run.
+def get_lexical_index() -> Optional[LexicalIndex]:
+    global _index, _index_build
+
+    build = _current_build()
+    if build is None:
+        return None
+    if _index is not None and build == _index_build:
+        return _index
+
+    with _lock:
+        if _index is None or build != _index_build:
+            _index = LexicalIndex(LEXICAL_DIR / build)
+            _index_build = build
+    return _index
+
+
+# Starts a new build seeded with the live index's chunks, minus excluded ones.
+def load_builder(exclude: Callable[[Document], bool] = lambda doc: False) -> LexicalIndexBuilder:
+    current = get_lexical_index()
+    builder = LexicalIndexBuilder()
+    if current is not None:
+        for doc in current.documents:
+            if not exclude(doc):
+                builder.add(doc)
+    return builder
@@ -0,0 +1,78 @@
+import os
+import threading
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+_HF_MODEL_ID = f"sentence-transformers/{EMBEDDING_MODEL}"
+
+# "torch" (default) or "onnx"; onnx needs sentence-transformers>=3.2 with
+# the onnx extra and falls back to torch when unavailable.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ENCODE_BATCH_SIZE = int(os.getenv("EMBEDDING_ENCODE_BATCH_SIZE", "64"))
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+_lock = threading.Lock()
+_tokenizer = None
+_model = None
+_cross_encoder = None
+
+
+# Tokenizer alone (no model weights) for chunking.
+def get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None:
+        with _lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(_HF_MODEL_ID, use_fast=True)
+    return _tokenizer
+
+
+def _load_model():
+    from sentence_transformers import SentenceTransformer
+
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            return SentenceTransformer(EMBEDDING_MODEL, backend="onnx")
+        except (TypeError, ImportError, ValueError) as e:
+            print(f"⚠️ ONNX embedding backend unavailable ({e}), using torch")
+
+    return SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+
+# The single SentenceTransformer shared by ingestion and query-time search.
+def get_embedding_model():
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                print("🔄 Loading embedding model...")
+                _model = _load_model()
+    return _model
+
+
+def get_cross_encoder():
+    global _cross_encoder
+    if _cross_encoder is None:
+        with _lock:
+            if _cross_encoder is None:
+                from sentence_transformers import CrossEncoder
+                print("🔄 Loading re-ranking model...")
+                _cross_encoder = CrossEncoder(RERANK_MODEL, device="cpu", max_length=512)
+    return _cross_encoder
+
+
+class SharedEmbeddings(Embeddings):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = get_embedding_model().encode(
+            list(texts),
+            batch_size=EMBEDDING_ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -1,5 +1,16 @@
-from backend.rag.preprocessing import preprocess
-from backend.rag.vector_store import build_vector_store
+from backend.rag.preprocessing import iter_source_files, iter_chunked_files, INGEST_WORKERS
+from backend.rag.vector_store import (
+    build_vector_store,
+    build_partition,
+    upsert_documents,
+    delete_chunks,
+    flush_vector_store,
+    flush_embedding_cache,
+    chunk_ids,
+)
+from backend.rag.ingest_manifest import file_hash, load_manifest, save_manifest
+from backend.rag.lexical_index import LexicalIndexBuilder, get_lexical_index, load_builder
+from backend.rag.table_store import write_table, remove_table, clear_tables
 from pathlib import Path
 
 BASE_DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "Fintech-data"
@@ -12,7 +23,7 @@ EXPECTED_FOLDERS = {
     "general",
 }
 
-def run_pipeline_once():
+def _data_directories():
     directories = [d for d in BASE_DATA_PATH.iterdir() if d.is_dir()]
     folder_names = {d.name.lower() for d in directories}
 
@@ -22,11 +33,179 @@ def run_pipeline_once():
             f"❌ Missing required data folders: {sorted(missing)}"
         )
 
-    result = preprocess(directories)
-    build_vector_store(result["documents"])
+    return directories
+
+def _manifest_key(file: Path) -> str:
+    return file.relative_to(BASE_DATA_PATH).as_posix()
+
+# Streams chunks out of the parallel chunker while recording what the
+# manifest needs, so the full document list is never held in memory.
+class _IngestTracker:
+    def __init__(self, directories, lexical: LexicalIndexBuilder):
+        self.lexical = lexical
+        self.manifest = {}
+        self.chunks_per_department = {d.name.lower(): 0 for d in directories}
+        self.total_chunks = 0
+        self._files = iter_chunked_files(iter_source_files(directories))
+
+    def __iter__(self):
+        for department, file, chunks in self._files:
+            self.manifest[_manifest_key(file)] = {
+                "hash": file_hash(file),
+                "department": department,
+                "chunk_ids": chunk_ids(chunks),
+            }
+            self.total_chunks += len(chunks)
+            self.chunks_per_department[department] += len(chunks)
+            for chunk in chunks:
+                self.lexical.add(chunk)
+            if file.suffix == ".csv":
+                write_table(file, department)
+            yield from chunks
+
+# Starts the next lexical build from the live one minus `exclude`. Stores
+# built before the lexical index existed have no live one to start from, so
+# the chunks of `files` are read again (without embedding) instead of
+# publishing an index that only covers what is being re-ingested.
+def _lexical_builder(exclude, files) -> LexicalIndexBuilder:
+    if get_lexical_index() is not None:
+        return load_builder(exclude=exclude)
+
+    builder = LexicalIndexBuilder()
+    for _, _, chunks in iter_chunked_files(files):
+        for chunk in chunks:
+            builder.add(chunk)
+    return builder
+
+def run_pipeline_once(incremental: bool = False):
+    directories = _data_directories()
+
+    manifest = load_manifest()
+    if incremental and manifest:
+        return _run_incremental(directories, manifest)
+
+    clear_tables()
+    tracker = _IngestTracker(directories, LexicalIndexBuilder())
+    build_vector_store(tracker)
+    tracker.lexical.save()
+    flush_embedding_cache()
+    save_manifest(tracker.manifest)
+
+    return {
+        "total_documents": tracker.total_chunks,
+        "total_chunks": tracker.total_chunks,
+        "chunks_per_department": tracker.chunks_per_department,
+    }
+
+# Re-embed only files whose content hash changed since the last run.
+def _run_incremental(directories, manifest):
+    seen = set()
+    changed = []
+    stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "chunks_upserted": 0}
+
+    for department, file in iter_source_files(directories):
+        key = _manifest_key(file)
+        seen.add(key)
+
+        digest = file_hash(file)
+        previous = manifest.get(key)
+        if previous and previous["hash"] == digest:
+            stats["unchanged"] += 1
+            continue
+
+        changed.append((department, file, digest))
+
+    digests = {file: digest for _, file, digest in changed}
+    files = [(department, file) for department, file, _ in changed]
+
+    removed = sorted(set(manifest) - seen)
+    stale_sources = {(department, file.name) for department, file in files}
+    stale_sources |= {(manifest[key]["department"], Path(key).name) for key in removed}
+    lexical = None
+    if files or removed or get_lexical_index() is None:
+        changed_files = {file for _, file in files}
+        lexical = _lexical_builder(
+            exclude=lambda doc: (
+                doc.metadata.get("department"),
+                doc.metadata.get("source_path"),
+            ) in stale_sources,
+            files=[
+                (department, file) for department, file in iter_source_files(directories)
+                if file not in changed_files
+            ],
+        )
+
+    for department, file, documents in iter_chunked_files(files, workers=min(len(files), INGEST_WORKERS)):
+        key = _manifest_key(file)
+        previous = manifest.get(key)
+        new_ids = chunk_ids(documents)
+
+        if previous:
+            # Drop trailing chunks when the file got shorter.
+            stale = set(previous["chunk_ids"]) - set(new_ids)
+            delete_chunks(previous["department"], sorted(stale))
+
+        upsert_documents(department, documents)
+        for doc in documents:
+            lexical.add(doc)
+        if file.suffix == ".csv":
+            write_table(file, department)
+
+        manifest[key] = {
+            "hash": digests[file],
+            "department": department,
+            "chunk_ids": new_ids,
+        }
+        stats["updated" if previous else "added"] += 1
+        stats["chunks_upserted"] += len(documents)
+
+    for key in removed:
+        entry = manifest.pop(key)
+        delete_chunks(entry["department"], entry["chunk_ids"])
+        if key.endswith(".csv"):
+            remove_table(Path(key), entry["department"])
+        stats["removed"] += 1
+
+    if files or removed:
+        flush_vector_store()
+    if lexical is not None:
+        lexical.save()
+    flush_embedding_cache()
+    save_manifest(manifest)
+    return stats
+
+# Re-ingest one department: its own partition (VECTOR_STORE_PARTITIONED=true),
+# or its chunks in the shared collection or in-process index.
+def rebuild_department(department: str):
+    matches = [
+        d for d in BASE_DATA_PATH.iterdir()
+        if d.is_dir() and d.name.lower() == department.lower()
+    ]
+    if not matches:
+        raise RuntimeError(f"❌ Missing data folder: {department}")
+
+    lexical = _lexical_builder(
+        exclude=lambda doc: doc.metadata.get("department") == department.lower(),
+        files=[
+            (name, file) for name, file in iter_source_files(_data_directories())
+            if name != department.lower()
+        ],
+    )
+    # Tables of CSVs that were removed would otherwise outlive them.
+    clear_tables(department.lower())
+    tracker = _IngestTracker(matches, lexical)
+    build_partition(department.lower(), tracker)
+    lexical.save()
+
+    manifest = {
+        key: entry for key, entry in load_manifest().items()
+        if entry["department"] != department.lower()
+    }
+    manifest.update(tracker.manifest)
+    flush_embedding_cache()
+    save_manifest(manifest)
 
     return {
-        "total_documents": result["total_documents"],
-        "total_chunks": result["total_chunks"],
-        "chunks_per_department": result["chunks_per_department"],
+        "department": department.lower(),
+        "total_chunks": tracker.total_chunks,
     }
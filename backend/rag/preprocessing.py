@@ -1,15 +1,29 @@
+import csv
+import io
+import os
 import re
-from typing import Dict, List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
 from pathlib import Path
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 from langchain_core.documents import Document
 
-from backend.rag.rbac import roles_for_department
+from backend.rag.rbac import roles_for_department, role_access_metadata
+from backend.rag.model_registry import get_tokenizer
 
 MAX_TOKENS = 256  
 OVERLAP = 50      
 
+SUPPORTED_SUFFIXES = {".md", ".txt", ".csv"}
+
+# Files are read and chunked in parallel; 1 keeps everything in-process.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+# CSVs are chunked by whole rows with the header repeated in every chunk.
+CSV_ROW_CHUNKING = os.getenv("CSV_ROW_CHUNKING", "true").lower() == "true"
+CSV_READ_BATCH_ROWS = int(os.getenv("CSV_READ_BATCH_ROWS", "5000"))
+
 def _clean(text: str) -> str:
     text = re.sub(r"[-_]{3,}", " ", text)
     text = re.sub(r"(?:-\s*){5,}", " ", text)
@@ -23,64 +37,146 @@ def _read_file(path: Path) -> str:
         return path.read_text(encoding="utf-8", errors="ignore")
     return ""
 
-def preprocess(directories: List[Path]) -> Dict:
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    tokenizer = model.tokenizer
-
-    documents: List[Document] = []
-    total_chunks = 0
-    chunks_per_department: Dict[str, int] = {}
+def load_tokenizer():
+    return get_tokenizer()
 
+def iter_source_files(directories: List[Path]) -> Iterator[Tuple[str, Path]]:
     for directory in directories:
         department = directory.name.lower()
-        chunks_per_department.setdefault(department, 0)
-
         for file in directory.rglob("*"):
-            if file.suffix not in {".md", ".txt", ".csv"}:
-                continue
-
-            raw = _clean(_read_file(file))
-            if not raw:
-                continue
-
-            token_ids = tokenizer(
-                raw,
-                add_special_tokens=False,
-                truncation=False,
-                return_attention_mask=False,
-            )["input_ids"]
-
-            start = 0
-            idx = 0
-
-            while start < len(token_ids):
-                end = min(start + MAX_TOKENS, len(token_ids))
-                chunk_ids = token_ids[start:end]
-                text = tokenizer.decode(chunk_ids)
-
-                roles = roles_for_department(department)
-
-                documents.append(
-                    Document(
-                        page_content=text,
-                        metadata={
-                            "chunk_id": f"{file.name}::chunk_{idx}",
-                            "source_path": str(file.name), 
-                            "department": department,
-                            "accessible_roles": ",".join(roles),
-                        },
-                    )
-                )
-
-                total_chunks += 1
-                chunks_per_department[department] += 1
-
-                idx += 1
-                start += (MAX_TOKENS - OVERLAP)
+            if file.suffix in SUPPORTED_SUFFIXES:
+                yield department, file
 
+def _chunk_metadata(file: Path, department: str, idx: int) -> Dict:
     return {
-        "documents": documents,
-        "total_documents": len(documents),
-        "total_chunks": total_chunks,
-        "chunks_per_department": chunks_per_department,
-    }
\ No newline at end of file
+        # Also the vector store id, so it must be unique across departments.
+        "chunk_id": f"{department}/{file.name}::chunk_{idx}",
+        "source_path": str(file.name), 
+        "department": department,
+        "accessible_roles": ",".join(roles_for_department(department)),
+        **role_access_metadata(department),
+    }
+
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(
+        [_clean(str(v)) for v in values]
+    )
+    return buffer.getvalue()
+
+# Packs whole rows under a repeated header up to MAX_TOKENS, reading the file
+# in CSV_READ_BATCH_ROWS batches so large tables never sit in memory at once.
+def chunk_csv(file: Path, department: str, tokenizer) -> List[Document]:
+    documents: List[Document] = []
+    header = None
+    header_tokens = 0
+    rows: List[str] = []
+    used = 0
+    row_start = 0
+    row_number = 0
+
+    def flush():
+        nonlocal rows, used, row_start
+        if not rows:
+            return
+        metadata = _chunk_metadata(file, department, len(documents))
+        metadata["row_start"] = row_start
+        metadata["row_end"] = row_number - 1
+        documents.append(
+            Document(page_content="\n".join([header] + rows), metadata=metadata)
+        )
+        rows, used, row_start = [], header_tokens, row_number
+
+    for frame in pd.read_csv(file, chunksize=CSV_READ_BATCH_ROWS, dtype=str, keep_default_na=False):
+        if header is None:
+            header = _csv_line(frame.columns)
+            header_tokens = len(tokenizer(header, add_special_tokens=False)["input_ids"])
+            used = header_tokens
+
+        lines = [_csv_line(values) for values in frame.itertuples(index=False)]
+        counts = [
+            len(ids) for ids in
+            tokenizer(lines, add_special_tokens=False)["input_ids"]
+        ] if lines else []
+
+        for line, count in zip(lines, counts):
+            if rows and used + count > MAX_TOKENS:
+                flush()
+            rows.append(line)
+            used += count
+            row_number += 1
+
+    flush()
+    return documents
+
+def chunk_file(file: Path, department: str, tokenizer) -> List[Document]:
+    if file.suffix == ".csv" and CSV_ROW_CHUNKING:
+        return chunk_csv(file, department, tokenizer)
+
+    raw = _clean(_read_file(file))
+    if not raw:
+        return []
+
+    # Offsets let us slice chunk text straight from the source, no decode.
+    offsets = tokenizer(
+        raw,
+        add_special_tokens=False,
+        truncation=False,
+        return_attention_mask=False,
+        return_offsets_mapping=True,
+    )["offset_mapping"]
+
+    documents: List[Document] = []
+    start = 0
+    idx = 0
+
+    while start < len(offsets):
+        end = min(start + MAX_TOKENS, len(offsets))
+        text = raw[offsets[start][0]:offsets[end - 1][1]]
+
+        documents.append(
+            Document(
+                page_content=text,
+                metadata=_chunk_metadata(file, department, idx),
+            )
+        )
+
+        idx += 1
+        start += (MAX_TOKENS - OVERLAP)
+
+    return documents
+
+_worker_tokenizer = None
+
+def _init_worker():
+    global _worker_tokenizer
+    _worker_tokenizer = load_tokenizer()
+
+def _chunk_task(department: str, file: Path) -> List[Document]:
+    return chunk_file(file, department, _worker_tokenizer)
+
+# Yields (department, file, chunks) in input order. At most a few files per
+# worker are in flight, so memory does not grow with the size of the corpus.
+def iter_chunked_files(
+    files: Iterable[Tuple[str, Path]],
+    workers: int = INGEST_WORKERS,
+) -> Iterator[Tuple[str, Path, List[Document]]]:
+    if workers <= 1:
+        tokenizer = None
+        for department, file in files:
+            if tokenizer is None:
+                tokenizer = load_tokenizer()
+            yield department, file, chunk_file(file, department, tokenizer)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+        for department, file in files:
+            pending.append((department, file, pool.submit(_chunk_task, department, file)))
+            if len(pending) >= workers * 2:
+                department, file, future = pending.popleft()
+                yield department, file, future.result()
+
+        while pending:
+            department, file, future = pending.popleft()
+            yield department, file, future.result()
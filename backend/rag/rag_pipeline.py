@@ -1,38 +1,171 @@
-from backend.rag.retriever import secure_search_with_scores
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.rag.retriever import (
+    secure_search_with_scores,
+    hybrid_search_with_scores,
+    HYBRID_SEARCH_ENABLED,
+)
+from backend.rag.lexical_index import get_lexical_index
 from backend.rag.citation_utils import extract_citations
-from backend.rag.confidence_utils import calculate_confidence_from_scores
-from backend.llm.llm_client import LLMClient
+from backend.rag.confidence_utils import calculate_confidence_from_scores, select_relevant
+from backend.llm.llm_client import LLMClient, LLMErrorPiece, LLM_ERROR_MESSAGE
 from backend.llm.prompt_templates import build_prompt
-from backend.rag.vector_store import get_vector_store
+from backend.llm.context_packer import estimate_tokens
+from backend.rag.vector_store import get_vector_store, get_embeddings
+from backend.rag.model_registry import get_cross_encoder
+from backend.rag.answer_cache import AnswerCache, ANSWER_CACHE_ENABLED
+from backend.rag.ingest_manifest import store_version
+from backend.rag.reranker import rerank, RERANK_ENABLED, RERANK_CANDIDATES
+from backend.rag.table_store import answer_structured, TABLE_QUERIES_ENABLED
+from backend.metrics import (
+    RETRIEVED_CHUNKS,
+    observe_stage,
+    record_cache,
+    record_tokens,
+    span,
+)
 
 FALLBACK_MESSAGE = "The requested information is not available in the provided documents."
 
+# k becomes an upper bound: results past RELEVANCE_MAX_DISTANCE (Chroma's
+# squared L2, 0-4 for normalized embeddings) or past a jump of more than
+# RELEVANCE_CLIFF_GAP between neighbouring distances are dropped. When
+# nothing is left the question is answered with the fallback, without the LLM.
+ADAPTIVE_K_ENABLED = os.getenv("ADAPTIVE_K_ENABLED", "true").lower() == "true"
+RELEVANCE_MAX_DISTANCE = float(os.getenv("RELEVANCE_MAX_DISTANCE", "1.3"))
+RELEVANCE_CLIFF_GAP = float(os.getenv("RELEVANCE_CLIFF_GAP", "0.2"))
+ADAPTIVE_MIN_K = int(os.getenv("ADAPTIVE_MIN_K", "2"))
+
+# Embedding and Chroma search are CPU/disk bound; keep them off the event loop
+# on a small dedicated pool instead of the shared anyio threadpool.
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_WORKERS,
+    thread_name_prefix="retrieval",
+)
+
+# Batch requests share the retrieval pool and the LLM with interactive
+# traffic, so each batch only gets a few slots of either at a time.
+BATCH_SEARCH_CONCURRENCY = int(os.getenv("BATCH_SEARCH_CONCURRENCY", "2"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+BATCH_ERROR_MESSAGE = "Failed to answer this question."
+
+
+# run_in_executor doesn't carry contextvars over; copy them so stages timed in
+# the worker still land in the request's Server-Timing.
+def _offload(fn, *args):
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return loop.run_in_executor(retrieval_executor, call)
+
 
 class RAGPipeline:
     def __init__(self):
         self.llm = LLMClient()
+        self.cache = (
+            AnswerCache(
+                embed=lambda q: get_embeddings().embed_query(q),
+                version=store_version,
+            )
+            if ANSWER_CACHE_ENABLED
+            else None
+        )
 
-    def run(self, user_role: str, query: str, k: int = 15):
+    # Loads the model and store and runs one embedding and one search, so the
+    # first real request doesn't pay for it.
+    def warm_up(self):
+        get_vector_store()
+        get_embeddings().embed_query("warm up")
+        if RERANK_ENABLED:
+            get_cross_encoder()
+        self._retrieve("employees", "warm up", 1)
+
+    def _cache_get(self, scope: str, query: str, embedding=None):
+        if self.cache is None:
+            return None
+
+        with span("answer_cache"):
+            cached = self.cache.get(scope, query, embedding)
+        record_cache("answer", cached is not None)
+        return cached
+
+    def _cache_put(self, scope: str, query: str, result, embedding=None):
+        if self.cache is not None and result["answer"] != LLM_ERROR_MESSAGE:
+            self.cache.put(scope, query, result, embedding)
+
+    def _search(self, user_role: str, query: str, k: int, embedding=None):
         vector_store = get_vector_store() 
 
-        results = secure_search_with_scores(
+        lexical_index = get_lexical_index() if HYBRID_SEARCH_ENABLED else None
+        if lexical_index is not None:
+            return hybrid_search_with_scores(
+                vector_store,
+                lexical_index,
+                query,
+                user_role,
+                k,
+                embedding,
+            )
+
+        return secure_search_with_scores(
             vector_store,
             query,
             user_role,
             k,
+            embedding,
         )
 
-        if not results:
-            return {
-                "answer": FALLBACK_MESSAGE,
-                "confidence": 0.0,
-                "citations": [],
-            }
+    # Exact lookups and aggregates over CSV tables skip retrieval and the LLM.
+    def _structured(self, user_role: str, query: str):
+        if not TABLE_QUERIES_ENABLED:
+            return None
 
-        documents = [doc for doc, _ in results]
-        prompt = build_prompt(query, documents)
+        with span("structured_lookup"):
+            return answer_structured(query, user_role)
+
+    def _retrieve(self, user_role: str, query: str, k: int, embedding=None):
+        if not RERANK_ENABLED:
+            results = self._search(user_role, query, k, embedding)
+        else:
+            candidates = self._search(user_role, query, max(k, RERANK_CANDIDATES), embedding)
+            with span("rerank"):
+                results = rerank(query, candidates, k)
 
-        answer = self.llm.generate(prompt)
+        if ADAPTIVE_K_ENABLED:
+            # Fused and re-ranked lists are ordered by something other than
+            # distance, so they are cut by rank.
+            ranked = RERANK_ENABLED or (
+                HYBRID_SEARCH_ENABLED and get_lexical_index() is not None
+            )
+            results = select_relevant(
+                results,
+                RELEVANCE_MAX_DISTANCE,
+                RELEVANCE_CLIFF_GAP,
+                ADAPTIVE_MIN_K,
+                ranked,
+            )
+
+        RETRIEVED_CHUNKS.observe(len(results))
+        return results
+
+    def _embed_batch(self, queries):
+        with span("embed_batch"):
+            return get_embeddings().embed_documents(queries)
+
+    def _prompt(self, query: str, results):
+        with span("prompt_build"):
+            prompt = build_prompt(query, [doc for doc, _ in results])
+        record_tokens("prompt", estimate_tokens(prompt))
+        return prompt
+
+    def _result(self, results, answer: str):
+        record_tokens("completion", estimate_tokens(answer))
+        documents = [doc for doc, _ in results]
 
         return {
             "answer": answer,
@@ -40,5 +173,164 @@ class RAGPipeline:
             "citations": extract_citations(documents),
         }
 
+    def _fallback(self):
+        return {
+            "answer": FALLBACK_MESSAGE,
+            "confidence": 0.0,
+            "citations": [],
+        }
+
+    def run(self, user_role: str, query: str, k: int = 15):
+        scope = f"{user_role}:{k}"
+
+        cached = self._cache_get(scope, query)
+        if cached is not None:
+            return cached
+
+        structured = self._structured(user_role, query)
+        if structured is not None:
+            return structured
+
+        results = self._retrieve(user_role, query, k)
+
+        if not results:
+            result = self._fallback()
+        else:
+            prompt = self._prompt(query, results)
+            with span("llm_generate"):
+                answer = self.llm.generate(prompt)
+            result = self._result(results, answer)
+
+        self._cache_put(scope, query, result)
+        return result
+
+    async def arun(self, user_role: str, query: str, k: int = 15):
+        scope = f"{user_role}:{k}"
+
+        cached = await _offload(self._cache_get, scope, query)
+        if cached is not None:
+            return cached
+
+        structured = await _offload(self._structured, user_role, query)
+        if structured is not None:
+            return structured
+
+        results = await _offload(self._retrieve, user_role, query, k)
+
+        if not results:
+            result = self._fallback()
+        else:
+            prompt = self._prompt(query, results)
+            with span("llm_generate"):
+                answer = await self.llm.agenerate(prompt)
+            result = self._result(results, answer)
+
+        await _offload(self._cache_put, scope, query, result)
+        return result
+
+    # Async generator of ("token", text) events followed by one ("done", result).
+    async def astream(self, user_role: str, query: str, k: int = 15):
+        scope = f"{user_role}:{k}"
+
+        cached = await _offload(self._cache_get, scope, query)
+        if cached is not None:
+            yield "token", cached["answer"]
+            yield "done", cached
+            return
+
+        structured = await _offload(self._structured, user_role, query)
+        if structured is not None:
+            yield "token", structured["answer"]
+            yield "done", structured
+            return
+
+        results = await _offload(self._retrieve, user_role, query, k)
+
+        if not results:
+            result = self._fallback()
+            yield "token", result["answer"]
+            yield "done", result
+            return
+
+        prompt = self._prompt(query, results)
+
+        pieces = []
+        failed = False
+        started = time.perf_counter()
+        async for piece in self.llm.astream(prompt):
+            if not pieces:
+                observe_stage("llm_first_token", time.perf_counter() - started)
+            failed = failed or isinstance(piece, LLMErrorPiece)
+            pieces.append(piece)
+            yield "token", piece
+        observe_stage("llm_generate", time.perf_counter() - started)
+
+        result = self._result(results, "".join(pieces).strip())
+
+        # A partial answer followed by the error text must not be served again.
+        if not failed:
+            await _offload(self._cache_put, scope, query, result)
+        yield "done", result
+
+
+    # Answers many questions for one role, yielding (index, result) in
+    # completion order. All queries are embedded in one forward pass, shared
+    # by the cache lookup and the search; searches and LLM calls are capped
+    # per batch. A failed item yields (index, {"error": ...}) and the rest
+    # carry on.
+    async def arun_batch(self, user_role: str, queries, k: int = 15):
+        scope = f"{user_role}:{k}"
+
+        embeddings = await _offload(self._embed_batch, list(queries))
+
+        todo = []
+        for i, query in enumerate(queries):
+            ready = await _offload(self._cache_get, scope, query, embeddings[i])
+            if ready is None:
+                ready = await _offload(self._structured, user_role, query)
+            if ready is not None:
+                yield i, ready
+            else:
+                todo.append(i)
+
+        if not todo:
+            return
+
+        search_slots = asyncio.Semaphore(BATCH_SEARCH_CONCURRENCY)
+        llm_slots = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+        async def answer(i):
+            query = queries[i]
+            async with search_slots:
+                results = await _offload(self._retrieve, user_role, query, k, embeddings[i])
+
+            if not results:
+                return self._fallback()
+
+            prompt = self._prompt(query, results)
+            async with llm_slots:
+                with span("llm_generate"):
+                    answer = await self.llm.agenerate(prompt)
+
+            result = self._result(results, answer)
+            await _offload(self._cache_put, scope, query, result, embeddings[i])
+            return result
+
+        async def safe_answer(i):
+            try:
+                return i, await answer(i)
+            except Exception as e:
+                print(f"❌ Batch query {i} failed: {e!r}")
+                return i, {"error": BATCH_ERROR_MESSAGE}
+
+        tasks = [asyncio.ensure_future(safe_answer(i)) for i in todo]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # The client went away: stop the rest.
+            for task in tasks:
+                task.cancel()
+
 
-rag_pipeline = RAGPipeline()
\ No newline at end of file
+rag_pipeline = RAGPipeline()
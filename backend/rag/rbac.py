@@ -32,3 +32,28 @@ def roles_for_department(department: str) -> List[str]:
             allowed_roles.append(role)
             
     return sorted(allowed_roles)
+
+def role_metadata_key(role: str) -> str:
+    return f"role_{role.lower()}"
+
+# Per-role boolean flags stored on every chunk so Chroma can filter with `where`.
+def role_access_metadata(department: str) -> Dict[str, bool]:
+    allowed = set(roles_for_department(department))
+    return {
+        role_metadata_key(role): role in allowed
+        for role in ROLE_DOCUMENT_MAP
+    }
+
+# Bit positions used by the in-memory indexes (lexical, ANN) for RBAC masks.
+ROLES = list(ROLE_DOCUMENT_MAP)
+
+def role_bit(role: str) -> int:
+    return 1 << ROLES.index(role)
+
+def role_mask(metadata: dict) -> int:
+    allowed = {r.strip() for r in metadata.get("accessible_roles", "").split(",")}
+    mask = 0
+    for role in ROLES:
+        if role in allowed:
+            mask |= role_bit(role)
+    return mask
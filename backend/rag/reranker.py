@@ -0,0 +1,60 @@
+import os
+import time
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+
+from backend.rag.model_registry import get_cross_encoder
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+# Vector hits fetched per query and handed to the cross-encoder.
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+
+_stats = {"reranked": 0, "fallbacks": 0}
+
+
+# Re-orders vector hits by cross-encoder relevance, keeping each hit's
+# original distance. If the budget runs out, the scored prefix is ranked and
+# the unscored tail follows in vector order.
+def rerank(
+    query: str,
+    results: List[Tuple[Document, float]],
+    k: int,
+    budget_ms: float = RERANK_BUDGET_MS,
+    batch_size: int = RERANK_BATCH_SIZE,
+) -> List[Tuple[Document, float]]:
+    if len(results) <= 1:
+        return results[:k]
+
+    # Loading the model is a one-off cost (see warm_up), not part of the budget.
+    model = get_cross_encoder()
+    deadline = time.perf_counter() + budget_ms / 1000
+
+    scores: List[float] = []
+    for start in range(0, len(results), batch_size):
+        if time.perf_counter() > deadline:
+            break
+
+        batch = results[start:start + batch_size]
+        scores.extend(
+            float(s) for s in model.predict(
+                [(query, doc.page_content) for doc, _ in batch],
+                batch_size=batch_size,
+                show_progress_bar=False,
+            )
+        )
+
+    if len(scores) < len(results):
+        _stats["fallbacks"] += 1
+    else:
+        _stats["reranked"] += 1
+
+    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    order.extend(range(len(scores), len(results)))
+    return [results[i] for i in order[:k]]
+
+
+def rerank_stats() -> dict:
+    return dict(_stats)
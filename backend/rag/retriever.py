@@ -1,7 +1,20 @@
-from typing import List, Tuple
+import os
+from typing import Dict, List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
 
+from backend.rag.rbac import ROLE_DOCUMENT_MAP, role_metadata_key
+from backend.rag.confidence_utils import LEXICAL_MATCH_DISTANCE, mark_lexical_match
+from backend.rag.vector_store import PartitionedVectorStore, get_embeddings
+from backend.rag.lexical_index import LexicalIndex, tokenize
+from backend.metrics import span
+
+# Fuse BM25 with vector search when a lexical index has been built.
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+# Hits taken from each retriever before fusion.
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = 60
+
 def role_allowed(doc: Document, user_role: str) -> bool:
     roles = {
         r.strip()
@@ -10,24 +23,105 @@ def role_allowed(doc: Document, user_role: str) -> bool:
     return user_role in roles
 
 
+def role_filter(role: str) -> dict:
+    return {role_metadata_key(role): True}
+
+
 def secure_search_with_scores(
     vector_store: Chroma,
     query: str,
     role: str,
     k: int = 5,
+    embedding: Optional[List[float]] = None,
+) -> List[Tuple[Document, float]]:
+
+    role = role.lower()
+    if role not in ROLE_DOCUMENT_MAP:
+        return []
+
+    # Embedded here rather than inside the store so the two show up as
+    # separate stages in the latency metrics. Batch callers pass their own.
+    if embedding is None:
+        with span("embed_query"):
+            embedding = get_embeddings().embed_query(query)
+
+    # RBAC is applied inside the vector search, so every hit is already allowed.
+    with span("vector_search"):
+        if isinstance(vector_store, PartitionedVectorStore):
+            results = vector_store.similarity_search_by_vector_with_score(
+                embedding,
+                k=k,
+                filter=role_filter(role),
+                departments=ROLE_DOCUMENT_MAP[role],
+            )
+        else:
+            results = vector_store.similarity_search_by_vector_with_relevance_scores(
+                embedding,
+                k=k,
+                filter=role_filter(role),
+            )
+
+    # Defence in depth against stale or tampered metadata.
+    with span("rbac_filter"):
+        return [
+            (doc, score)
+            for doc, score in results
+            if role_allowed(doc, role)
+        ]
+
+
+def _is_identifier_query(terms: List[str]) -> bool:
+    return bool(terms) and all(any(c.isdigit() for c in t) for t in terms)
+
+
+# Reciprocal rank fusion of BM25 and vector hits under the same role filter.
+# Results keep the (Document, distance) shape; hits found only lexically take
+# the worst vector distance in the candidate set.
+def hybrid_search_with_scores(
+    vector_store: Chroma,
+    lexical_index: LexicalIndex,
+    query: str,
+    role: str,
+    k: int = 5,
+    embedding: Optional[List[float]] = None,
 ) -> List[Tuple[Document, float]]:
 
-    results = vector_store.similarity_search_with_score(query, k=k * 5)
+    role = role.lower()
+    if role not in ROLE_DOCUMENT_MAP:
+        return []
+
+    candidates = max(k, HYBRID_CANDIDATES)
+    terms = tokenize(query)
+
+    with span("lexical_search"):
+        lexical = [
+            (doc, score)
+            for doc, score in lexical_index.search(query, role, candidates)
+            if role_allowed(doc, role)
+        ]
+
+    # Exact identifier lookups (employee IDs, product codes) skip the embedding
+    # and fusion: BM25 order, marked as lexical matches with a fixed distance.
+    if lexical and _is_identifier_query(terms) and lexical_index.has_terms(terms):
+        return [
+            (mark_lexical_match(doc), LEXICAL_MATCH_DISTANCE)
+            for doc, _ in lexical[:k]
+        ]
 
-    safe_results: List[Tuple[Document, float]] = []
+    vector = secure_search_with_scores(vector_store, query, role, candidates, embedding)
 
-    for doc, score in results:
-        if not role_allowed(doc, role):
-            continue
+    fused: Dict[str, list] = {}
+    for rank, (doc, distance) in enumerate(vector, 1):
+        fused[doc.metadata.get("chunk_id")] = [1 / (RRF_K + rank), doc, distance]
 
-        safe_results.append((doc, score))
+    for rank, (doc, _) in enumerate(lexical, 1):
+        entry = fused.setdefault(doc.metadata.get("chunk_id"), [0.0, doc, None])
+        entry[0] += 1 / (RRF_K + rank)
 
-        if len(safe_results) == k:
-            break
+    worst = max((distance for _, distance in vector), default=1.0)
+    ranked = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
 
-    return safe_results
+    return [
+        (doc, distance if distance is not None else worst)
+        for _, doc, distance in ranked[:k]
+    ]
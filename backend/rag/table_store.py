@@ -0,0 +1,259 @@
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from backend.rag.rbac import ROLE_DOCUMENT_MAP
+from backend.rag.vector_store import DATA_DIR
+
+# Columnar copies of CSV sources: TABLES_DIR/<department>/<file stem>.parquet.
+TABLES_DIR = DATA_DIR / "tables"
+
+# Off by default: answers skip retrieval and the LLM, so only questions that
+# name the columns they want are answered here.
+TABLE_QUERIES_ENABLED = os.getenv("TABLE_QUERIES_ENABLED", "false").lower() == "true"
+MAX_LOOKUP_ROWS = 10
+# Columns with at most this many distinct values can be used as filters.
+MAX_FILTER_CARDINALITY = 50
+
+_AGGREGATES = [
+    ("count", ("how many", "headcount", "head count", "number of", "count")),
+    ("mean", ("average", "avg", "mean")),
+    ("sum", ("total", "sum")),
+    ("max", ("highest", "maximum", "max")),
+    ("min", ("lowest", "minimum", "min")),
+]
+
+
+def table_path(department: str, file: Path) -> Path:
+    return TABLES_DIR / department / f"{file.stem}.parquet"
+
+
+# Streams the CSV into Parquet block by block.
+def write_table(file: Path, department: str):
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    target = table_path(department, file)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".tmp")
+
+    reader = pacsv.open_csv(file)
+    with pq.ParquetWriter(tmp, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    tmp.replace(target)
+
+
+def remove_table(file: Path, department: str):
+    table_path(department, file).unlink(missing_ok=True)
+
+
+def clear_tables(department: Optional[str] = None):
+    shutil.rmtree(TABLES_DIR / department if department else TABLES_DIR, ignore_errors=True)
+
+
+_frames: Dict[Path, Tuple[int, pd.DataFrame]] = {}
+_lock = threading.Lock()
+
+
+def _load(path: Path) -> pd.DataFrame:
+    mtime = path.stat().st_mtime_ns
+    with _lock:
+        cached = _frames.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    frame = pd.read_parquet(path)
+    with _lock:
+        _frames[path] = (mtime, frame)
+    return frame
+
+
+def tables_for_role(role: str) -> List[Tuple[str, Path]]:
+    tables = []
+    for department in ROLE_DOCUMENT_MAP.get(role.lower(), []):
+        directory = TABLES_DIR / department
+        if directory.is_dir():
+            tables.extend((department, p) for p in sorted(directory.glob("*.parquet")))
+    return tables
+
+
+def _normalize(text: str) -> str:
+    return " " + re.sub(r"[^a-z0-9]+", " ", text.lower()).strip() + " "
+
+
+def _mentions(query: str, column: str) -> bool:
+    name = column.lower().replace("_", " ")
+    return any(f" {variant} " in query for variant in (name, name + "s", name + "es"))
+
+
+def _aggregate(query: str) -> Optional[str]:
+    for name, words in _AGGREGATES:
+        if any(f" {w} " in query for w in words):
+            return name
+    return None
+
+
+def _group_column(query: str, frame: pd.DataFrame) -> Optional[str]:
+    for column in frame.columns:
+        name = column.lower().replace("_", " ")
+        for lead in ("by", "per", "each", "every"):
+            if any(f" {lead} {v} " in query for v in (name, name + "s", name + "es")):
+                return column
+    return None
+
+
+def _apply_filters(query: str, frame: pd.DataFrame, skip: List[str]) -> Tuple[pd.DataFrame, List[str]]:
+    applied = []
+    for column in frame.columns:
+        if column in skip or not pd.api.types.is_string_dtype(frame[column]):
+            continue
+        values = frame[column].dropna().unique()
+        if len(values) > MAX_FILTER_CARDINALITY:
+            continue
+        for value in values:
+            if _normalize(str(value)).strip() and _normalize(str(value)) in query:
+                frame = frame[frame[column] == value]
+                applied.append(f"{column} = {value}")
+                break
+    return frame, applied
+
+
+def _identifiers(query_raw: str) -> set:
+    return {
+        t.lower() for t in re.findall(r"[A-Za-z0-9_-]+", query_raw)
+        if any(c.isdigit() for c in t) and any(c.isalpha() for c in t)
+    }
+
+
+# Bare numbers (years, "top 5", amounts) are conditions we can't apply.
+def _has_bare_numbers(query: str) -> bool:
+    return any(t.isdigit() for t in query.split())
+
+
+# Rows whose key column holds one of the identifiers, restricted to the key
+# and the columns the question names. The key is the column the question
+# names, or else the only unique-valued column holding the identifier.
+def _lookup(query_raw: str, query: str, frame: pd.DataFrame) -> Optional[pd.DataFrame]:
+    wanted = _identifiers(query_raw)
+    if not wanted:
+        return None
+
+    keys = [
+        column for column in frame.columns
+        if pd.api.types.is_string_dtype(frame[column])
+        and frame[column].str.lower().isin(wanted).any()
+    ]
+    named_keys = [c for c in keys if _mentions(query, c)]
+    unique_keys = [c for c in keys if frame[c].is_unique]
+    if len(named_keys) == 1:
+        key = named_keys[0]
+    elif not named_keys and len(unique_keys) == 1:
+        key = unique_keys[0]
+    else:
+        return None
+
+    fields = [c for c in frame.columns if c != key and _mentions(query, c)]
+    if not fields and key != frame.columns[0] and _asks_which(query):
+        fields = [frame.columns[0]]
+    if not fields:
+        return None
+
+    matches = frame[frame[key].str.lower().isin(wanted)]
+    return matches[[key] + fields].head(MAX_LOOKUP_ROWS)
+
+
+def _asks_which(query: str) -> bool:
+    return any(f" {w} " in query for w in ("which", "who", "whose"))
+
+
+def _format_rows(rows: pd.DataFrame) -> str:
+    blocks = []
+    for _, row in rows.iterrows():
+        blocks.append("\n".join(f"- **{col}**: {row[col]}" for col in rows.columns))
+    return "\n\n".join(blocks)
+
+
+def _format_series(series: pd.Series, label: str) -> str:
+    lines = [f"- **{index}**: {_number(value)}" for index, value in series.items()]
+    return f"{label}:\n" + "\n".join(lines)
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return f"{value:,}" if isinstance(value, int) else str(value)
+
+
+def _answer_from_table(query_raw: str, frame: pd.DataFrame) -> Optional[str]:
+    query = _normalize(query_raw)
+    if _has_bare_numbers(query):
+        return None
+
+    if _identifiers(query_raw):
+        rows = _lookup(query_raw, query, frame)
+        return _format_rows(rows) if rows is not None else None
+
+    aggregate = _aggregate(query)
+    if aggregate is None:
+        return None
+
+    group = _group_column(query, frame)
+    numeric = [
+        c for c in frame.select_dtypes("number").columns
+        if c != group and _mentions(query, c)
+    ]
+    measure = numeric[0] if numeric else None
+
+    if aggregate != "count" and measure is None:
+        return None
+    if aggregate == "count" and group is None:
+        return None
+
+    frame, filters = _apply_filters(query, frame, skip=[c for c in (group, measure) if c])
+    where = f" where {', '.join(filters)}" if filters else ""
+
+    if aggregate == "count":
+        series = frame.groupby(group).size().sort_values(ascending=False)
+        return _format_series(series, f"Count by {group}{where}")
+
+    if group is None and aggregate in ("max", "min") and _asks_which(query):
+        # Name the row, not just the value: its first column (the table's
+        # key) plus any other columns the question asks for.
+        if frame[measure].dropna().empty:
+            return None
+        index = getattr(frame[measure], "idx" + aggregate)()
+        columns = [frame.columns[0]] + [
+            c for c in frame.columns[1:] if c != measure and _mentions(query, c)
+        ] + [measure]
+        return _format_rows(frame.loc[[index], columns])
+
+    if group is None:
+        value = getattr(frame[measure], aggregate)()
+        return f"- **{aggregate} of {measure}{where}**: {_number(float(value))}"
+
+    series = getattr(frame.groupby(group)[measure], aggregate)().sort_values(ascending=False)
+    return _format_series(series, f"{aggregate.capitalize()} {measure} by {group}{where}")
+
+
+# Answers exact lookups and simple aggregates straight from the role's tables,
+# or returns None so the question goes through retrieval and the LLM.
+def answer_structured(query: str, role: str) -> Optional[Dict]:
+    for department, path in tables_for_role(role):
+        answer = _answer_from_table(query, _load(path))
+        if answer:
+            return {
+                "answer": answer,
+                "confidence": 1.0,
+                "citations": [{
+                    "id": 1,
+                    "source_path": f"{path.stem}.csv",
+                    "department": department,
+                }],
+            }
+    return None
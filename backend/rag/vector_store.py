@@ -1,65 +1,395 @@
-from typing import List
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from pathlib import Path
 import shutil
+import threading
 import os
 
+from backend.rag.rbac import ROLE_DOCUMENT_MAP, role_metadata_key
+from backend.rag.embedding_cache import CachedEmbeddings
+from backend.rag.ann_index import AnnVectorStore, get_ann_store, new_ann_store
+from backend.rag.model_registry import EMBEDDING_MODEL, SharedEmbeddings
+
 DATA_DIR = Path(os.getenv("DATA_DIR", "backend/vector_db"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 PERSIST_DIR = str(DATA_DIR / "chroma")
 _COLLECTION_NAME = "company_docs"
 
+# "chroma" (default), or an in-process index: "numpy" (exact search over a
+# memory-mapped float32 matrix) or "hnsw" (hnswlib graph, needs hnswlib).
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()
+ANN_DIR = DATA_DIR / "ann"
+
+# One collection per department instead of a single shared collection.
+# Chroma only; the in-process index filters by role bitmask instead.
+PARTITIONED = os.getenv("VECTOR_STORE_PARTITIONED", "false").lower() == "true"
+
+# Persistent embedding cache keyed by text hash, shared by ingest and queries.
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = DATA_DIR / "embedding_cache"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+
+# Chunks embedded and written to Chroma per call during ingestion.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+DEPARTMENTS = sorted({d for dirs in ROLE_DOCUMENT_MAP.values() for d in dirs})
+
 _embeddings = None
-_vector_store: Chroma | None = None
+_vector_store = None
+# Guards lazy initialisation so concurrent first requests load things once.
+_init_lock = threading.RLock()
+# Bumped on every write so caches built on search results can detect rebuilds.
+_generation = 0
 
 
 def get_embeddings():
     global _embeddings
-    if _embeddings is None:
-        from langchain_huggingface import HuggingFaceEmbeddings
-        print("🔄 Loading embedding model...")
-        _embeddings = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2"
-        )
+    if _embeddings is not None:
+        return _embeddings
+
+    with _init_lock:
+        if _embeddings is None:
+            embeddings = SharedEmbeddings()
+            if EMBEDDING_CACHE_ENABLED:
+                embeddings = CachedEmbeddings(
+                    embeddings,
+                    cache_dir=EMBEDDING_CACHE_DIR,
+                    model_name=EMBEDDING_MODEL,
+                    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+                )
+            _embeddings = embeddings
     return _embeddings
 
-def build_vector_store(documents: List[Document]) -> Chroma:
-    global _vector_store
 
-    print("⚠️ Building vector store locally only...")
+# Called once an ingest run has written its vectors.
+def flush_embedding_cache():
+    if isinstance(_embeddings, CachedEmbeddings):
+        _embeddings.flush()
+
+
+def store_generation() -> int:
+    return _generation
+
+
+def _bump_generation():
+    global _generation
+    _generation += 1
+
+
+def chunk_ids(documents: List[Document]) -> List[str]:
+    return [doc.metadata["chunk_id"] for doc in documents]
+
+
+def partition_name(department: str) -> str:
+    return f"{_COLLECTION_NAME}_{department}"
+
+
+# Routes a search to the per-department collections and merges top-k by distance.
+class PartitionedVectorStore:
+    def __init__(self, partitions: Dict[str, Chroma]):
+        self.partitions = partitions
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 5,
+        filter: Optional[dict] = None,
+        departments: Optional[List[str]] = None,
+    ) -> List[Tuple[Document, float]]:
+        # Embed once and reuse the vector for every partition.
+        embedding = get_embeddings().embed_query(query)
+        return self.similarity_search_by_vector_with_score(
+            embedding,
+            k=k,
+            filter=filter,
+            departments=departments,
+        )
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        filter: Optional[dict] = None,
+        departments: Optional[List[str]] = None,
+    ) -> List[Tuple[Document, float]]:
+        if departments is None:
+            departments = list(self.partitions)
 
-    _vector_store = Chroma.from_documents(
-        documents=documents,
-        embedding=get_embeddings(),
+        targets = [self.partitions[d] for d in departments if d in self.partitions]
+        if not targets:
+            return []
+
+        merged: List[Tuple[Document, float]] = []
+        for store in targets:
+            merged.extend(
+                store.similarity_search_by_vector_with_relevance_scores(
+                    embedding,
+                    k=k,
+                    filter=filter,
+                )
+            )
+
+        merged.sort(key=lambda pair: pair[1])
+        return merged[:k]
+
+
+def _open_partition(department: str) -> Chroma:
+    return Chroma(
+        embedding_function=get_embeddings(),
+        persist_directory=PERSIST_DIR,
+        collection_name=partition_name(department),
+    )
+
+
+def _open_collection() -> Chroma:
+    return Chroma(
+        embedding_function=get_embeddings(),
         persist_directory=PERSIST_DIR,
         collection_name=_COLLECTION_NAME,
     )
 
+
+def _batches(documents: Iterable[Document], size: int) -> Iterator[List[Document]]:
+    batch: List[Document] = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _in_process() -> bool:
+    if VECTOR_STORE_BACKEND not in ("chroma", "numpy", "hnsw"):
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+    return VECTOR_STORE_BACKEND != "chroma"
+
+
+@lru_cache(maxsize=None)
+def _resolve_index_kind(backend: str) -> str:
+    if backend == "hnsw":
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError as e:
+            print(f"⚠️ hnswlib unavailable ({e}), using exact NumPy search")
+            return "numpy"
+    return backend
+
+
+def _ann_index_kind() -> str:
+    return _resolve_index_kind(VECTOR_STORE_BACKEND)
+
+
+def _ann_store(create: bool = False) -> Optional[AnnVectorStore]:
+    if create:
+        return new_ann_store(ANN_DIR, get_embeddings(), _ann_index_kind(), EMBEDDING_MODEL)
+    return get_ann_store(ANN_DIR, get_embeddings(), _ann_index_kind())
+
+
+def _rebuild_ann_department(department: str, documents: Iterable[Document], batch_size: int):
+    store = get_vector_store()
+    store.delete([
+        doc["metadata"]["chunk_id"]
+        for doc in store.docs
+        if doc["metadata"].get("department") == department
+        and doc["metadata"].get("chunk_id") in store.rows
+    ])
+    for batch in _batches(documents, batch_size):
+        store.add_documents(batch, ids=chunk_ids(batch))
+    store.save()
+
+    _bump_generation()
+    return store
+
+
+# Without partitions the department's chunks live in the shared collection:
+# replace them there, since that is the collection searches read.
+def _rebuild_shared_department(department: str, documents: Iterable[Document], batch_size: int):
+    store = _vector_store if isinstance(_vector_store, Chroma) else _open_collection()
+    stale = store.get(where={"department": department}, include=[])["ids"]
+    if stale:
+        store.delete(ids=stale)
+    for batch in _batches(documents, batch_size):
+        store.add_documents(batch, ids=chunk_ids(batch))
+
+    _bump_generation()
+    return store
+
+
+def build_partition(
+    department: str,
+    documents: Iterable[Document],
+    batch_size: int = EMBED_BATCH_SIZE,
+) -> Chroma:
+    if _in_process():
+        return _rebuild_ann_department(department, documents, batch_size)
+
+    if not PARTITIONED:
+        return _rebuild_shared_department(department, documents, batch_size)
+
+    # Drop and rebuild a single department without touching the others.
+    _open_partition(department).delete_collection()
+
+    store = _open_partition(department)
+    for batch in _batches(documents, batch_size):
+        store.add_documents(batch, ids=chunk_ids(batch))
+
+    if isinstance(_vector_store, PartitionedVectorStore):
+        _vector_store.partitions[department] = store
+
+    _bump_generation()
+    return store
+
+
+# Consumes documents lazily and embeds/writes them in fixed-size batches.
+def build_vector_store(
+    documents: Iterable[Document],
+    partitioned: bool = PARTITIONED,
+    batch_size: int = EMBED_BATCH_SIZE,
+):
+    global _vector_store
+
+    print("⚠️ Building vector store locally only...")
+    _bump_generation()
+
+    if _in_process():
+        store = _ann_store(create=True)
+        for batch in _batches(documents, batch_size):
+            store.add_documents(batch, ids=chunk_ids(batch))
+        store.save()
+
+        _vector_store = store
+        return _vector_store
+
+    if partitioned:
+        # Start every partition empty so a rebuild never leaves stale chunks behind.
+        for department in DEPARTMENTS:
+            _open_partition(department).delete_collection()
+
+        store = PartitionedVectorStore({
+            department: _open_partition(department)
+            for department in DEPARTMENTS
+        })
+
+        for batch in _batches(documents, batch_size):
+            by_department: Dict[str, List[Document]] = {}
+            for doc in batch:
+                by_department.setdefault(doc.metadata["department"], []).append(doc)
+
+            for department, docs in by_department.items():
+                if department not in store.partitions:
+                    store.partitions[department] = _open_partition(department)
+                store.partitions[department].add_documents(docs, ids=chunk_ids(docs))
+
+        _vector_store = store
+        return _vector_store
+
+    # Start from an empty collection so a rebuild never leaves stale chunks behind.
+    _open_collection().delete_collection()
+
+    store = _open_collection()
+    for batch in _batches(documents, batch_size):
+        store.add_documents(batch, ids=chunk_ids(batch))
+
+    _vector_store = store
     return _vector_store
 
 
-def get_vector_store() -> Chroma:
+def _store_for(department: str):
+    store = get_vector_store()
+    if isinstance(store, PartitionedVectorStore):
+        if department not in store.partitions:
+            store.partitions[department] = _open_partition(department)
+        return store.partitions[department]
+    return store
+
+
+# Chroma ids are the chunk ids, so re-adding a chunk overwrites it in place.
+def upsert_documents(department: str, documents: List[Document]):
+    if documents:
+        _store_for(department).add_documents(documents, ids=chunk_ids(documents))
+        _bump_generation()
+
+
+def delete_chunks(department: str, ids: List[str]):
+    if ids:
+        _store_for(department).delete(ids=ids)
+        _bump_generation()
+
+
+# Persists pending upserts/deletes. Chroma writes through, so only the
+# in-process index has anything to do here.
+def flush_vector_store():
+    if _in_process():
+        store = get_vector_store()
+        if store.dirty:
+            store.save()
+
+
+# Every search filters on the role_<name> flags, so a store written before
+# they existed (or an empty one) would answer every question with nothing.
+# Fail loudly instead: warm-up raises and /ready stays 503.
+def _check_role_metadata(collections: List[Chroma]):
+    records = 0
+    for collection in collections:
+        sample = collection.get(limit=1, include=["metadatas"])
+        if not sample["ids"]:
+            continue
+        records += 1
+        metadata = sample["metadatas"][0] or {}
+        missing = [r for r in ROLE_DOCUMENT_MAP if role_metadata_key(r) not in metadata]
+        if missing:
+            raise RuntimeError(
+                "Vector store has no per-role metadata "
+                f"({role_metadata_key(missing[0])}); rebuild it with the ingestion pipeline."
+            )
+
+    if not records:
+        raise RuntimeError("Vector store is empty; build it with the ingestion pipeline.")
+
+
+def get_vector_store():
     global _vector_store
 
+    if _in_process():
+        # Checked on every call so a build published by an ingest run is picked up.
+        store = _ann_store()
+        if store is None:
+            raise RuntimeError(
+                "Vector store not found. Build locally before deployment."
+            )
+        return store
+
     if _vector_store is not None:
         return _vector_store
 
-    persist_path = Path(PERSIST_DIR)
+    with _init_lock:
+        if _vector_store is not None:
+            return _vector_store
 
-    if not persist_path.exists():
-        raise RuntimeError(
-            "Vector store not found. Build locally before deployment."
-        )
+        persist_path = Path(PERSIST_DIR)
 
-    print("📦 Loading existing Chroma DB...")
+        if not persist_path.exists():
+            raise RuntimeError(
+                "Vector store not found. Build locally before deployment."
+            )
 
-    _vector_store = Chroma(
-        embedding_function=get_embeddings(),
-        persist_directory=PERSIST_DIR,
-        collection_name=_COLLECTION_NAME,
-    )
+        print("📦 Loading existing Chroma DB...")
+
+        if PARTITIONED:
+            store = PartitionedVectorStore({
+                department: _open_partition(department)
+                for department in DEPARTMENTS
+            })
+            _check_role_metadata(list(store.partitions.values()))
+        else:
+            store = _open_collection()
+            _check_role_metadata([store])
 
-    return _vector_store
\ No newline at end of file
+        _vector_store = store
+
+    return _vector_store
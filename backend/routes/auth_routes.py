@@ -1,17 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 
 from backend.auth.auth_utils import create_access_token
-from backend.auth.password_utils import verify_password
+from backend.auth.password_utils import averify_password, PasswordPoolFull
 from backend.db.user_repository import get_user_by_username
 
 router = APIRouter()
 
 @router.post("/login")
-def login(form: OAuth2PasswordRequestForm = Depends()):
-    user = get_user_by_username(form.username)
+async def login(form: OAuth2PasswordRequestForm = Depends()):
+    user = await run_in_threadpool(get_user_by_username, form.username)
 
-    if not user or not verify_password(form.password, user.hashed_password):
+    try:
+        valid = bool(user) and await averify_password(form.password, user.hashed_password)
+    except PasswordPoolFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Login temporarily overloaded, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_access_token(
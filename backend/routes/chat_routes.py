@@ -1,27 +1,41 @@
-from fastapi import APIRouter, Depends
+import json
+import os
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from backend.auth.dependencies import get_current_user
-from backend.auth.audit_logger import log_access
+from backend.auth.audit_logger import alog_access
 from backend.rag.rag_pipeline import rag_pipeline
 
 router = APIRouter()
 
+# Chunks sent to the LLM per question.
+QUERY_TOP_K = int(os.getenv("QUERY_TOP_K", "5"))
+
+# Largest number of questions accepted by /query/batch.
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "200"))
+
 class QueryRequest(BaseModel):
     query: str
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+
 @router.post("/query")
-def query_docs(
+async def query_docs(
     request: QueryRequest,
     user=Depends(get_current_user),
 ):
-    result = rag_pipeline.run(
+    result = await rag_pipeline.arun(
         user_role=user.role,
         query=request.query,
-        k=5,
+        k=QUERY_TOP_K,
     )
 
-    log_access(
+    await alog_access(
         username=user.username,
         role=user.role,
         query=request.query,
@@ -36,3 +50,108 @@ def query_docs(
         "confidence": result["confidence"],
         "citations": result["citations"],
     }
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Server-Sent Events: "token" events carry answer text, "done" carries the rest.
+@router.post("/query/stream")
+async def query_docs_stream(
+    request: QueryRequest,
+    user=Depends(get_current_user),
+):
+    async def events():
+        async for event, payload in rag_pipeline.astream(
+            user_role=user.role,
+            query=request.query,
+            k=QUERY_TOP_K,
+        ):
+            if event == "token":
+                yield _sse("token", {"text": payload})
+                continue
+
+            await alog_access(
+                username=user.username,
+                role=user.role,
+                query=request.query,
+                results_count=len(payload["citations"]),
+            )
+
+            yield _sse("done", {
+                "user": user.username,
+                "role": user.role,
+                "query": request.query,
+                "answer": payload["answer"],
+                "confidence": payload["confidence"],
+                "citations": payload["citations"],
+            })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# NDJSON: one line per question, in completion order; "index" points back
+# into the request's list.
+@router.post("/query/batch")
+async def query_docs_batch(
+    request: BatchQueryRequest,
+    user=Depends(get_current_user),
+):
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BATCH_MAX_QUERIES} queries per batch",
+        )
+
+    async def lines():
+        async for index, result in rag_pipeline.arun_batch(
+            user_role=user.role,
+            queries=request.queries,
+            k=QUERY_TOP_K,
+        ):
+            query = request.queries[index]
+
+            if "error" in result:
+                await alog_access(
+                    username=user.username,
+                    role=user.role,
+                    query=query,
+                    results_count=0,
+                    batch_index=index,
+                    error=result["error"],
+                )
+                yield json.dumps({
+                    "index": index,
+                    "query": query,
+                    "error": result["error"],
+                }) + "\n"
+                continue
+
+            await alog_access(
+                username=user.username,
+                role=user.role,
+                query=query,
+                results_count=len(result["citations"]),
+                batch_index=index,
+            )
+
+            yield json.dumps({
+                "index": index,
+                "query": query,
+                "answer": result["answer"],
+                "confidence": result["confidence"],
+                "citations": result["citations"],
+            }) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
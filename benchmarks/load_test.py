@@ -0,0 +1,276 @@
+"""Concurrent load generator for /login and /query.
+
+Creates throwaway users through backend.db.user_repository (one per virtual
+user, spread across roles), then has every virtual user log in and replay
+role-matched queries from benchmarks/queries.jsonl against a running backend
+for a fixed duration. Reports request count, errors, throughput and latency
+percentiles per endpoint; /query/stream also reports time to first token.
+
+Start the backend with the fake LLM so the numbers measure IntraBot, not
+Gemini, and with the answer cache off: the query pool is small, so with it
+on nearly every request after the first few is a cache hit:
+
+    LLM_BACKEND=fake FAKE_LLM_LATENCY_MS=800 ANSWER_CACHE_ENABLED=false \
+        uvicorn backend.main:app --workers 2
+    python -m benchmarks.load_test --users 50 --duration 60
+
+The report includes the answer cache hit share read from /metrics over the
+run, so a run that measured the cache rather than the pipeline shows up.
+
+The users are written to the same SQLite database the backend reads, so run
+this from the repository root on the backend host.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+QUERIES_PATH = Path(__file__).resolve().parent / "queries.jsonl"
+USER_PREFIX = "loadtest_"
+_ANSWER_CACHE_RE = re.compile(
+    r'^intrabot_cache_requests_total\{(?=[^}]*cache="answer")(?=[^}]*result="(hit|miss)")[^}]*\}\s+(\S+)',
+    re.MULTILINE,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=os.getenv("BACKEND_URL", "http://127.0.0.1:8000"))
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of /query load")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--roles", default=None, help="comma-separated, default every role")
+    parser.add_argument("--stream", action="store_true", help="use /query/stream instead of /query")
+    parser.add_argument("--relogin-every", type=int, default=0, help="log in again after N queries")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between requests")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--queries", default=str(QUERIES_PATH))
+    parser.add_argument("--keep-users", action="store_true", help="don't delete the test users")
+    parser.add_argument("--json", dest="json_out", default=None, help="write results as JSON")
+    return parser.parse_args(argv)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.statuses[endpoint][status] += 1
+            if status == 200:
+                self.latencies[endpoint].append(seconds)
+            else:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        import numpy as np
+
+        report = {}
+        for endpoint in sorted(set(self.statuses)):
+            values = np.asarray(self.latencies[endpoint] or [0.0]) * 1000
+            total = sum(self.statuses[endpoint].values())
+            report[endpoint] = {
+                "requests": total,
+                "errors": self.errors[endpoint],
+                "rps": round(total / elapsed, 2),
+                "p50_ms": round(float(np.percentile(values, 50)), 1),
+                "p95_ms": round(float(np.percentile(values, 95)), 1),
+                "p99_ms": round(float(np.percentile(values, 99)), 1),
+                "max_ms": round(float(values.max()), 1),
+                "statuses": {str(k): v for k, v in self.statuses[endpoint].items()},
+            }
+        return report
+
+
+def create_users(count, roles, password):
+    from backend.db.user_repository import create_user, delete_user
+
+    users = []
+    for i in range(count):
+        role = roles[i % len(roles)]
+        username = f"{USER_PREFIX}{role}_{i}"
+        # Leftovers from an aborted run would keep their old password.
+        delete_user(username)
+        create_user(username, role, password)
+        users.append((username, role))
+    return users
+
+
+def delete_users(users):
+    from backend.db.user_repository import delete_user
+
+    for username, _ in users:
+        delete_user(username)
+
+
+def answer_cache_counts(base_url, timeout):
+    counts = {"hit": 0.0, "miss": 0.0}
+    try:
+        text = requests.get(f"{base_url}/metrics", timeout=timeout).text
+    except requests.RequestException:
+        return None
+    for result, value in _ANSWER_CACHE_RE.findall(text):
+        counts[result] += float(value)
+    return counts
+
+
+def answer_cache_hit_share(before, after):
+    if before is None or after is None:
+        return None
+    hits = after["hit"] - before["hit"]
+    lookups = hits + after["miss"] - before["miss"]
+    return round(hits / lookups, 3) if lookups else 0.0
+
+
+def login(session, args, recorder, username):
+    started = time.perf_counter()
+    try:
+        response = session.post(
+            f"{args.base_url}/login",
+            data={"username": username, "password": args.password},
+            timeout=args.timeout,
+        )
+        status = response.status_code
+    except requests.RequestException:
+        status = "exception"
+    recorder.record("/login", time.perf_counter() - started, status)
+    return response.json()["access_token"] if status == 200 else None
+
+
+def query(session, args, recorder, token, text):
+    headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    try:
+        if not args.stream:
+            response = session.post(
+                f"{args.base_url}/query", headers=headers, json={"query": text}, timeout=args.timeout
+            )
+            recorder.record("/query", time.perf_counter() - started, response.status_code)
+            return
+
+        with session.post(
+            f"{args.base_url}/query/stream",
+            headers={**headers, "Accept": "text/event-stream"},
+            json={"query": text},
+            stream=True,
+            timeout=args.timeout,
+        ) as response:
+            first = None
+            for line in response.iter_lines(decode_unicode=True):
+                if first is None and line.startswith("data:"):
+                    first = time.perf_counter() - started
+            if first is not None:
+                recorder.record("/query/stream ttft", first, response.status_code)
+            recorder.record("/query/stream", time.perf_counter() - started, response.status_code)
+    except requests.RequestException:
+        recorder.record("/query/stream" if args.stream else "/query", time.perf_counter() - started, "exception")
+
+
+def virtual_user(args, recorder, username, role, queries, start_barrier, stop):
+    rng = random.Random(username)
+    pool = [q["query"] for q in queries if q["role"] == role] or [q["query"] for q in queries]
+    session = requests.Session()
+
+    # Everyone logs in at once: that burst is what sizes the bcrypt pool.
+    start_barrier.wait()
+    token = login(session, args, recorder, username)
+
+    sent = 0
+    while token and not stop.is_set():
+        query(session, args, recorder, token, rng.choice(pool))
+        sent += 1
+        if args.relogin_every and sent % args.relogin_every == 0:
+            token = login(session, args, recorder, username)
+        if args.think_ms:
+            time.sleep(args.think_ms / 1000)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.path.insert(0, str(ROOT))
+
+    from backend.rag.rbac import ROLE_DOCUMENT_MAP
+
+    roles = args.roles.split(",") if args.roles else sorted(ROLE_DOCUMENT_MAP)
+    queries = [json.loads(line) for line in open(args.queries, encoding="utf-8") if line.strip()]
+
+    print(f"Creating {args.users} users across {', '.join(roles)} ...")
+    users = create_users(args.users, roles, args.password)
+
+    recorder = Recorder()
+    start_barrier = threading.Barrier(len(users) + 1)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(args, recorder, username, role, queries, start_barrier, stop),
+            daemon=True,
+        )
+        for username, role in users
+    ]
+    cache_before = answer_cache_counts(args.base_url, args.timeout)
+    try:
+        for thread in threads:
+            thread.start()
+
+        start_barrier.wait()
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        stop.set()
+        if not args.keep_users:
+            delete_users(users)
+
+    report = {
+        "base_url": args.base_url,
+        "users": len(users),
+        "duration_s": round(elapsed, 2),
+        "endpoints": recorder.summary(elapsed),
+        "answer_cache_hit_share": answer_cache_hit_share(
+            cache_before, answer_cache_counts(args.base_url, args.timeout)
+        ),
+    }
+    print_report(report)
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    return report
+
+
+def print_report(report):
+    print(f"\n== {report['users']} users against {report['base_url']} for {report['duration_s']}s")
+    print(f"{'endpoint':<22}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, r in report["endpoints"].items():
+        print(
+            f"{endpoint:<22}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9}{r['p50_ms']:>10}"
+            f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}"
+        )
+
+    share = report["answer_cache_hit_share"]
+    if share is None:
+        print("answer cache hit share: unknown (/metrics unreachable)")
+    else:
+        print(f"answer cache hit share: {share:.1%}")
+        if share > 0:
+            print("  warning: cached answers skew /query latency; restart with ANSWER_CACHE_ENABLED=false")
+
+
+if __name__ == "__main__":
+    main()
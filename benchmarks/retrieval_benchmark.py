@@ -0,0 +1,251 @@
+"""Retrieval benchmark and regression harness.
+
+Builds the vector store from data/Fintech-data, optionally padded with
+synthetic distractor documents (10x-1000x), then replays the labelled
+queries in benchmarks/queries.jsonl for every role and reports recall@k,
+latency percentiles, QPS, index build time and index size. With
+--vector-backends chroma,numpy,hnsw every scale is built and measured once
+per vector store backend.
+
+Runs fully offline apart from the embedding model: the store is built in a
+temporary DATA_DIR and Gemini is replaced by a stub LLM
+(LLM_BACKEND=fake, so no GEMINI_API_KEY is needed).
+
+    python -m benchmarks.retrieval_benchmark --scales 1,10 --k 5 --vector-backends chroma,numpy
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SOURCE_DATA = ROOT / "data" / "Fintech-data"
+QUERIES_PATH = Path(__file__).resolve().parent / "queries.jsonl"
+
+MODES = ("vector", "hybrid", "pipeline", "end_to_end")
+
+
+class StubLLM:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    def generate(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        return "- stub answer"
+
+    async def agenerate(self, prompt: str) -> str:
+        return self.generate(prompt)
+
+
+# Lets end_to_end results, which only carry citations, be scored like hits.
+class _Cited:
+    def __init__(self, citation):
+        self.metadata = {
+            "source_path": citation.get("source_path"),
+            "accessible_roles": ",".join(_roles_for(citation.get("department"))),
+        }
+
+
+def _roles_for(department):
+    from backend.rag.rbac import roles_for_department
+    return roles_for_department(department or "")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10", help="corpus multipliers, e.g. 1,10,100,1000")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", default="vector,hybrid,pipeline", help=f"any of {','.join(MODES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="replays of the query set per mode")
+    parser.add_argument("--concurrency", type=int, default=1, help="threads used for the QPS run")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="stub LLM delay (end_to_end)")
+    parser.add_argument("--queries", default=str(QUERIES_PATH))
+    parser.add_argument("--workdir", default=None, help="keep corpora and stores here")
+    parser.add_argument("--json", dest="json_out", default=None, help="write results as JSON")
+    parser.add_argument("--partitioned", action="store_true", help="per-department collections")
+    parser.add_argument("--vector-backends", default="chroma", help="any of chroma,numpy,hnsw")
+    parser.add_argument("--embedding-cache", action="store_true", help="keep the embedding cache on")
+    return parser.parse_args(argv)
+
+
+def make_corpus(scale: int, dest: Path, seed: int = 7):
+    # Copies the real corpus and pads every department with shuffled-word
+    # distractors so the index holds roughly `scale` times as much text.
+    if dest.exists():
+        shutil.rmtree(dest)
+    shutil.copytree(SOURCE_DATA, dest)
+
+    rng = random.Random(seed)
+    for department in [d for d in dest.iterdir() if d.is_dir()]:
+        sources = [f for f in department.rglob("*") if f.suffix in {".md", ".txt", ".csv"}]
+        for i in range(scale - 1):
+            for source in sources:
+                words = re.findall(r"\S+", source.read_text(encoding="utf-8", errors="ignore"))
+                rng.shuffle(words)
+                (department / f"synthetic_{i}_{source.stem}.md").write_text(
+                    " ".join(words), encoding="utf-8"
+                )
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def percentiles(samples):
+    import numpy as np
+    values = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def recall_at_k(results, relevant) -> float:
+    retrieved = {doc.metadata.get("source_path") for doc, _ in results}
+    return len(retrieved & set(relevant)) / len(relevant)
+
+
+def run_mode(mode, queries, k, repeat, concurrency, search):
+    latencies = []
+    recalls = []
+    violations = 0
+
+    for _ in range(repeat):
+        for q in queries:
+            started = time.perf_counter()
+            results = search(mode, q["role"], q["query"], k)
+            latencies.append(time.perf_counter() - started)
+
+            recalls.append(recall_at_k(results, q["relevant"]))
+            violations += sum(
+                q["role"] not in doc.metadata.get("accessible_roles", "").split(",")
+                for doc, _ in results
+            )
+
+    workload = [q for _ in range(repeat) for q in queries]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda q: search(mode, q["role"], q["query"], k), workload))
+    elapsed = time.perf_counter() - started
+
+    per_role = {}
+    for q, r in zip(queries * repeat, recalls):
+        per_role.setdefault(q["role"], []).append(r)
+
+    return {
+        "mode": mode,
+        f"recall@{k}": round(sum(recalls) / len(recalls), 4),
+        "recall_by_role": {role: round(sum(v) / len(v), 4) for role, v in per_role.items()},
+        "rbac_violations": violations,
+        "qps": round(len(workload) / elapsed, 2),
+        **percentiles(latencies),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    modes = [m for m in args.modes.split(",") if m]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        sys.exit(f"Unknown modes: {sorted(unknown)}")
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="intrabot-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    # Must be set before any backend module reads its configuration.
+    os.environ["DATA_DIR"] = str(workdir / "store")
+    os.environ["VECTOR_STORE_PARTITIONED"] = "true" if args.partitioned else "false"
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "true" if args.embedding_cache else "false"
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ["LLM_BACKEND"] = "fake"
+    sys.path.insert(0, str(ROOT))
+
+    from backend.rag import pipeline
+    from backend.rag import vector_store
+    from backend.rag.vector_store import get_vector_store
+    from backend.rag.retriever import secure_search_with_scores, hybrid_search_with_scores
+    from backend.rag.lexical_index import get_lexical_index
+
+    rag = None
+    if {"pipeline", "end_to_end"} & set(modes):
+        from backend.rag.rag_pipeline import rag_pipeline as rag
+        rag.llm = StubLLM(args.llm_latency_ms)
+
+    def search(mode, role, query, k):
+        if mode == "vector":
+            return secure_search_with_scores(get_vector_store(), query, role, k)
+        if mode == "hybrid":
+            return hybrid_search_with_scores(get_vector_store(), get_lexical_index(), query, role, k)
+        if mode == "pipeline":
+            return rag._retrieve(role, query, k)
+        # end_to_end: full RAGPipeline.run with the stub LLM; recall uses citations.
+        result = rag.run(role, query, k)
+        return [
+            (_Cited(c), 0.0) for c in result["citations"]
+        ]
+
+    queries = [json.loads(line) for line in open(args.queries, encoding="utf-8") if line.strip()]
+
+    report = []
+    for scale in [int(s) for s in args.scales.split(",") if s]:
+        corpus = workdir / f"corpus_x{scale}"
+        make_corpus(scale, corpus)
+        pipeline.BASE_DATA_PATH = corpus
+
+        for backend in [b for b in args.vector_backends.split(",") if b]:
+            # Read at call time by vector_store, so switching needs no re-import.
+            vector_store.VECTOR_STORE_BACKEND = backend
+            index_dir = Path(vector_store.PERSIST_DIR if backend == "chroma" else vector_store.ANN_DIR)
+
+            started = time.perf_counter()
+            stats = pipeline.run_pipeline_once()
+            build_seconds = time.perf_counter() - started
+
+            entry = {
+                "scale": scale,
+                "vector_backend": backend,
+                "corpus_bytes": dir_size(corpus),
+                "chunks": stats["total_chunks"],
+                "build_seconds": round(build_seconds, 2),
+                "index_bytes": dir_size(index_dir),
+                "results": [
+                    run_mode(mode, queries, args.k, args.repeat, args.concurrency, search)
+                    for mode in modes
+                ],
+            }
+            report.append(entry)
+            print_entry(entry, args.k)
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return report
+
+
+def print_entry(entry, k):
+    print(
+        f"\n== scale x{entry['scale']} [{entry['vector_backend']}]: {entry['chunks']} chunks, "
+        f"{entry['corpus_bytes'] / 1e6:.2f} MB corpus, "
+        f"index {entry['index_bytes'] / 1e6:.2f} MB, built in {entry['build_seconds']}s"
+    )
+    print(f"{'mode':<12}{'recall@' + str(k):>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'QPS':>10}{'leaks':>8}")
+    for r in entry["results"]:
+        print(
+            f"{r['mode']:<12}{r[f'recall@{k}']:>10}{r['p50_ms']:>10}"
+            f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['qps']:>10}{r['rbac_violations']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
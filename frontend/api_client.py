@@ -1,4 +1,5 @@
 import os
+import json
 import requests
 from dotenv import load_dotenv
 
@@ -27,6 +28,50 @@ def query_backend(token: str, query: str):
     return response.json()
 
 
+# Yields (event, data) pairs from the SSE stream, or nothing on failure.
+def stream_query_backend(token: str, query: str):
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "text/event-stream",
+    }
+    with requests.post(
+        f"{BASE_URL}/query/stream",
+        headers=headers,
+        json={"query": query},
+        stream=True,
+    ) as response:
+        if response.status_code != 200:
+            return
+
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+
+
+# Yields one result dict per question as the backend finishes it; each has
+# an "index" into `queries`, and failed questions carry an "error" instead
+# of an answer.
+def batch_query_backend(token: str, queries: list):
+    headers = {"Authorization": f"Bearer {token}"}
+    with requests.post(
+        f"{BASE_URL}/query/batch",
+        headers=headers,
+        json={"queries": queries},
+        stream=True,
+    ) as response:
+        if response.status_code != 200:
+            return
+
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
+
+
 def get_users(token: str):
     headers = {"Authorization": f"Bearer {token}"}
     response = requests.get(f"{BASE_URL}/users/", headers=headers)
@@ -1,5 +1,5 @@
 import streamlit as st
-from api_client import login_user, query_backend, get_users, add_user_api, delete_user_api
+from api_client import login_user, stream_query_backend, get_users, add_user_api, delete_user_api
 
 # Page Config
 st.set_page_config(page_title="Company Internal Chatbot",page_icon="🏢",layout="wide")
@@ -251,10 +251,24 @@ def chatbot_page():
             {"role": "user", "content": user_input}
         )
 
-        response = query_backend(
-            st.session_state.token,
-            user_input,
-        )
+        with st.chat_message("user"):
+            st.markdown(user_input)
+
+        # Render answer tokens as they stream in from the backend.
+        response = None
+        streamed_text = ""
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            for event, data in stream_query_backend(
+                st.session_state.token,
+                user_input,
+            ):
+                if event == "token":
+                    streamed_text += data["text"]
+                    placeholder.markdown(streamed_text + "▌")
+                elif event == "done":
+                    response = data
+            placeholder.markdown(streamed_text)
 
         if not response:
             assistant_text = "❌ Error communicating with backend."
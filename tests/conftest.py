@@ -0,0 +1,85 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+# Module-level paths are read at import time, so point them at scratch space
+# before anything from backend is imported.
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="intrabot-tests-"))
+os.environ.setdefault("INGEST_WORKERS", "1")
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+ROOT = Path(__file__).resolve().parents[1]
+SOURCE_DATA = ROOT / "data" / "Fintech-data"
+
+
+# Bag-of-words hashed into 64 dimensions: deterministic, offline, and close
+# enough to a real model that shared words mean nearby vectors.
+class HashEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        vectors = []
+        for text in texts:
+            vector = np.zeros(64, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+            norm = np.linalg.norm(vector)
+            vectors.append((vector / norm if norm else vector).tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _word_tokenizer(tmp: Path):
+    from transformers import BertTokenizerFast
+
+    words = set()
+    for file in SOURCE_DATA.rglob("*"):
+        if file.is_file():
+            words |= set(re.findall(r"\w+|[^\w\s]", file.read_text(errors="ignore").lower()))
+    vocab = tmp / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *sorted(words)]))
+    return BertTokenizerFast(str(vocab), do_lower_case=True)
+
+
+@pytest.fixture(scope="session")
+def tokenizer(tmp_path_factory):
+    return _word_tokenizer(tmp_path_factory.mktemp("tokenizer"))
+
+
+# A private copy of the data folders and an empty store for each test.
+@pytest.fixture
+def store(tmp_path, monkeypatch, tokenizer):
+    from backend.rag import (
+        ingest_manifest,
+        lexical_index,
+        model_registry,
+        pipeline,
+        table_store,
+        vector_store,
+    )
+
+    data = tmp_path / "data"
+    shutil.copytree(SOURCE_DATA, data)
+
+    monkeypatch.setattr(model_registry, "_tokenizer", tokenizer)
+    monkeypatch.setattr(vector_store, "SharedEmbeddings", HashEmbeddings)
+    monkeypatch.setattr(vector_store, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(vector_store, "PERSIST_DIR", str(tmp_path / "chroma"))
+    monkeypatch.setattr(vector_store, "ANN_DIR", tmp_path / "ann")
+    monkeypatch.setattr(vector_store, "_embeddings", None)
+    monkeypatch.setattr(vector_store, "_vector_store", None)
+    monkeypatch.setattr(lexical_index, "LEXICAL_DIR", tmp_path / "lexical")
+    monkeypatch.setattr(lexical_index.LexicalIndexBuilder.__init__, "__defaults__", (tmp_path / "lexical",))
+    monkeypatch.setattr(lexical_index, "_index", None)
+    monkeypatch.setattr(lexical_index, "_index_build", None)
+    monkeypatch.setattr(ingest_manifest, "MANIFEST_PATH", tmp_path / "manifest.json")
+    monkeypatch.setattr(table_store, "TABLES_DIR", tmp_path / "tables")
+    monkeypatch.setattr(pipeline, "BASE_DATA_PATH", data)
+    return data
@@ -0,0 +1,28 @@
+from backend.auth import audit_logger
+from backend.auth.audit_logger import AuditWriter
+
+
+def test_batch_is_dropped_after_the_retries_run_out(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(audit_logger, "AUDIT_MAX_RETRIES", 1)
+    writer = AuditWriter(tmp_path / "audit.jsonl")
+
+    def fail(batch):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writer, "_write", fail)
+    writer.put({"user": "alice", "query": "payroll"})
+
+    assert writer.flush(timeout=5)
+    assert writer.stats()["dropped"] == 1
+    assert writer.stats()["write_errors"] == 2
+    assert '"user": "alice"' in caplog.text
+
+
+def test_flush_gives_up_at_the_timeout(tmp_path, monkeypatch):
+    writer = AuditWriter(tmp_path / "audit.jsonl")
+    # Nothing consumes the queue, as if the writer thread were stuck.
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+    writer._thread = object()
+    writer.put({"user": "alice"})
+
+    assert writer.flush(timeout=0.05) is False
@@ -0,0 +1,27 @@
+import numpy as np
+
+from backend.rag.embedding_cache import CachedEmbeddings
+from tests.conftest import HashEmbeddings
+
+
+def test_cache_hits_survive_a_reopen(tmp_path):
+    cache = CachedEmbeddings(HashEmbeddings(), tmp_path, "hash", max_entries=4)
+    first = cache.embed_documents(["alpha", "beta"])
+    cache.flush()
+
+    reopened = CachedEmbeddings(HashEmbeddings(), tmp_path, "hash", max_entries=4)
+    assert reopened.embed_documents(["alpha", "beta"]) == first
+    assert reopened.hits == 2 and reopened.misses == 0
+
+
+def test_slot_overwritten_by_another_process_is_a_miss(tmp_path):
+    reader = CachedEmbeddings(HashEmbeddings(), tmp_path, "hash", max_entries=1)
+    reader.embed_query("alpha")
+
+    # A second process evicts "alpha" for "beta" in the only slot.
+    writer = CachedEmbeddings(HashEmbeddings(), tmp_path, "hash", max_entries=1)
+    writer.embed_query("beta")
+
+    alpha = reader.embed_query("alpha")
+    assert reader.misses == 2
+    assert np.allclose(alpha, HashEmbeddings().embed_query("alpha"))
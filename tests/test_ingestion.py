@@ -0,0 +1,28 @@
+from backend.rag import pipeline, vector_store
+from backend.rag.retriever import secure_search_with_scores
+
+MARKER = "Zebrafish onboarding stipend"
+
+
+def test_rebuild_department_updates_shared_collection(store, monkeypatch):
+    monkeypatch.setattr(vector_store, "PARTITIONED", False)
+    pipeline.run_pipeline_once()
+
+    (store / "HR" / "stipend.md").write_text(f"# Stipend\n\n{MARKER} policy.\n")
+    pipeline.rebuild_department("hr")
+
+    shared = vector_store.get_vector_store()
+    hits = secure_search_with_scores(shared, MARKER, "hr", k=1)
+    assert MARKER in hits[0][0].page_content
+
+    # Old HR chunks were replaced, not duplicated.
+    hr_ids = shared.get(where={"department": "hr"}, include=[])["ids"]
+    assert len(hr_ids) == len(set(hr_ids))
+    assert not any(
+        getattr(c, "name", c).startswith("company_docs_")
+        for c in shared._client.list_collections()
+    )
+
+    # The manifest now matches the store, so an incremental run has nothing to do.
+    stats = pipeline.run_pipeline_once(incremental=True)
+    assert stats["updated"] == stats["added"] == stats["removed"] == 0
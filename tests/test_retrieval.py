@@ -0,0 +1,80 @@
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from backend.rag import lexical_index, pipeline, reranker, vector_store
+from backend.rag.confidence_utils import (
+    LEXICAL_MATCH_DISTANCE,
+    is_lexical_match,
+    mark_lexical_match,
+    select_relevant,
+)
+from backend.rag.retriever import hybrid_search_with_scores
+
+
+@pytest.fixture
+def built(store):
+    pipeline.run_pipeline_once()
+    return vector_store.get_vector_store(), lexical_index.get_lexical_index()
+
+
+def test_identifier_lookup_skips_the_embedding(built, monkeypatch):
+    store, lexical = built
+
+    def fail(*args, **kwargs):
+        raise AssertionError("identifier lookups must not embed the query")
+
+    monkeypatch.setattr(vector_store.get_embeddings(), "embed_query", fail)
+
+    hits = hybrid_search_with_scores(store, lexical, "FINEMP1003", "hr", k=3)
+    assert hits
+    assert all(is_lexical_match(doc) for doc, _ in hits)
+    assert "FINEMP1003" in hits[0][0].page_content
+
+
+def _doc(name, **metadata):
+    return Document(page_content=name, metadata={"chunk_id": name, **metadata})
+
+
+def test_fused_lexical_only_hit_survives_adaptive_k():
+    # RRF put a lexical-only hit (given the candidate set's worst distance)
+    # above a close vector hit; a far vector hit trails.
+    fused = [
+        (_doc("vector-close"), 0.4),
+        (_doc("lexical-only"), 1.8),
+        (_doc("vector-ok"), 1.1),
+        (_doc("vector-far"), 1.8),
+    ]
+
+    kept = select_relevant(fused, max_distance=1.3, cliff_gap=0.2, min_k=1, ranked=True)
+
+    assert [doc.page_content for doc, _ in kept] == ["vector-close", "lexical-only", "vector-ok"]
+
+
+def test_exact_lexical_matches_ignore_the_distance_cut():
+    results = [
+        (_doc("vector-close"), 0.3),
+        (mark_lexical_match(_doc("FINEMP1003 row")), LEXICAL_MATCH_DISTANCE),
+        (_doc("vector-far"), 1.25),
+    ]
+
+    kept = select_relevant(results, max_distance=1.3, cliff_gap=0.2, min_k=1)
+
+    assert [doc.page_content for doc, _ in kept] == ["vector-close", "FINEMP1003 row"]
+
+
+def test_rerank_keeps_scores_finished_before_the_budget(monkeypatch):
+    class SlowCrossEncoder:
+        def predict(self, pairs, **kwargs):
+            time.sleep(0.05)
+            return [len(text) for _, text in pairs]
+
+    monkeypatch.setattr(reranker, "get_cross_encoder", SlowCrossEncoder)
+    results = [(_doc(name), 0.1 * i) for i, name in enumerate(["a", "bbb", "cc", "dddd"])]
+
+    # Only the first batch of two fits in the budget: it is re-ordered and
+    # the unscored tail follows in vector order.
+    kept = reranker.rerank("q", results, k=4, budget_ms=10, batch_size=2)
+
+    assert [doc.page_content for doc, _ in kept] == ["bbb", "a", "cc", "dddd"]
@@ -0,0 +1,33 @@
+import asyncio
+
+from backend.llm.backends import LLMBackend
+from backend.llm.scheduler import LLMScheduler
+
+
+class Echo(LLMBackend):
+    name = "echo"
+
+    async def agenerate(self, prompt):
+        await asyncio.sleep(0.1)
+        return prompt.upper()
+
+    async def astream(self, prompt):
+        yield prompt.upper()
+
+
+def test_caller_arriving_during_cancellation_gets_a_fresh_call():
+    scheduler = LLMScheduler(Echo())
+
+    async def scenario():
+        first = asyncio.ensure_future(scheduler._coalesced("hello"))
+        # Let the shared call reach the backend.
+        await asyncio.sleep(0.02)
+        first.cancel()
+        # first's cleanup cancels the shared call, which has not finished
+        # cancelling when the next caller with the same prompt arrives.
+        await asyncio.sleep(0)
+        return await scheduler._coalesced("hello")
+
+    result = asyncio.run_coroutine_threadsafe(scenario(), scheduler._loop).result(timeout=5)
+
+    assert result == "HELLO"
@@ -0,0 +1,44 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from backend.llm.backends import LLMBackend, LLMBackendError
+from backend.llm.llm_client import LLM_ERROR_MESSAGE, LLMClient
+from backend.rag.rag_pipeline import RAGPipeline
+
+
+class FailsAfterOneToken(LLMBackend):
+    name = "fails-after-one-token"
+
+    async def agenerate(self, prompt):
+        raise LLMBackendError(400, "unused")
+
+    async def astream(self, prompt):
+        yield "Partial"
+        raise LLMBackendError(400, "connection dropped")
+
+
+def _stream(pipeline, query):
+    async def collect():
+        return [event async for event in pipeline.astream("finance", query, k=3)]
+
+    return asyncio.run(collect())
+
+
+def test_failed_stream_is_not_cached(store, monkeypatch):
+    pipeline = RAGPipeline()
+    pipeline.llm = LLMClient([FailsAfterOneToken()])
+    chunk = Document(
+        page_content="Revenue grew 12% in Q3.",
+        metadata={"source_path": "q3.md", "department": "finance"},
+    )
+    monkeypatch.setattr(pipeline, "_structured", lambda role, query: None)
+    monkeypatch.setattr(pipeline, "_retrieve", lambda role, query, k, embedding=None: [(chunk, 0.4)])
+
+    events = _stream(pipeline, "How did revenue grow?")
+
+    kind, result = events[-1]
+    assert kind == "done"
+    assert result["answer"].startswith("Partial")
+    assert result["answer"].endswith(LLM_ERROR_MESSAGE)
+    assert pipeline.cache.get("finance:3", "How did revenue grow?") is None